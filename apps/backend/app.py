@@ -1,51 +1,142 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from pymongo.errors import WaitQueueTimeoutError
 from dotenv import load_dotenv
 import os
 from extensions import mongo
+from cli import register_commands
+from utils.database import init_mongo, pool_stats
+from utils.indexes import ensure_indexes_in_background
+from utils.hashing import HashingPoolSaturated
+from utils.response_cache import get_response_cache
+from utils.json_provider import MongoJSONProvider
+from utils.metrics import init_metrics
 
 from routes.auth import auth_bp
 from routes.users import user_bp
 from routes.projects import project_bp
 from routes.tasks import task_bp
+from routes.jobs import job_bp
 
 load_dotenv()
 
-app = Flask(__name__)
 
-CORS(
-    app,
-    resources={
-        r"/api/*": {
-            "origins": ["http://localhost:3000"],
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-            "allow_headers": ["Content-Type", "Authorization"],
-            "supports_credentials": True,
-        }
-    },
-)
+def create_app(config=None):
+    """
+    Build the Flask application.
 
-app.config["MONGO_URI"] = os.getenv("MONGO_URI")
-app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
+    Settings are read from the environment; ``config`` overrides them before
+    the Mongo client is configured.
 
+    Args:
+        config (dict, optional): Config values to override
 
-app.url_map.strict_slashes = False
+    Returns:
+        Flask: The application
+    """
+    app = Flask(__name__)
+    app.json = MongoJSONProvider(app)
 
-print("MONGO_URI being used:", app.config.get("MONGO_URI"))
+    CORS(
+        app,
+        resources={
+            r"/api/*": {
+                "origins": ["http://localhost:3000"],
+                "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
+                "allow_headers": ["Content-Type", "Authorization"],
+                "supports_credentials": True,
+            }
+        },
+    )
 
-mongo.init_app(app)
+    app.config["MONGO_URI"] = os.getenv("MONGO_URI")
+    app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
+    app.config["MONGO_MAX_POOL_SIZE"] = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+    app.config["MONGO_MIN_POOL_SIZE"] = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+    app.config["MONGO_WAIT_QUEUE_TIMEOUT_MS"] = int(
+        os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000)
+    )
+    app.config["MONGO_SERVER_SELECTION_TIMEOUT_MS"] = int(
+        os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000)
+    )
+    app.config["MONGO_CONNECT_TIMEOUT_MS"] = int(
+        os.getenv("MONGO_CONNECT_TIMEOUT_MS", 10000)
+    )
+    app.config["MONGO_SOCKET_TIMEOUT_MS"] = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 0))
+    app.config["MONGO_COMPRESSORS"] = os.getenv("MONGO_COMPRESSORS", "")
+    app.config["ACCESS_TOKEN_MINUTES"] = int(os.getenv("ACCESS_TOKEN_MINUTES", 15))
+    app.config["REFRESH_TOKEN_DAYS"] = int(os.getenv("REFRESH_TOKEN_DAYS", 14))
+    app.config["JWT_CACHE_SIZE"] = int(os.getenv("JWT_CACHE_SIZE", 1024))
+    app.config["BCRYPT_ROUNDS"] = int(os.getenv("BCRYPT_ROUNDS", 12))
+    app.config["HASH_POOL_WORKERS"] = int(
+        os.getenv("HASH_POOL_WORKERS", os.cpu_count() or 1)
+    )
+    app.config["HASH_POOL_QUEUE"] = int(
+        os.getenv("HASH_POOL_QUEUE", app.config["HASH_POOL_WORKERS"] * 4)
+    )
+    app.config["JOB_WORKERS"] = int(os.getenv("JOB_WORKERS", 2))
+    app.config["CASCADE_BATCH_SIZE"] = int(os.getenv("CASCADE_BATCH_SIZE", 500))
+    app.config["CASCADE_BACKGROUND_THRESHOLD"] = int(
+        os.getenv("CASCADE_BACKGROUND_THRESHOLD", 1000)
+    )
+    app.config["READ_USER_REFS_BY_ID"] = (
+        os.getenv("READ_USER_REFS_BY_ID", "false").lower() == "true"
+    )
+    app.config["RESPONSE_CACHE_SIZE"] = int(os.getenv("RESPONSE_CACHE_SIZE", 512))
+    app.config["RESPONSE_CACHE_TTL"] = int(os.getenv("RESPONSE_CACHE_TTL", 60))
+    app.config["BULK_MAX_TASKS"] = int(os.getenv("BULK_MAX_TASKS", 500))
+    app.config["MAX_PAGE_SIZE"] = int(os.getenv("MAX_PAGE_SIZE", 100))
+    app.config["EXPORT_BATCH_SIZE"] = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+    app.config["METRICS_ENABLED"] = (
+        os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    )
+    app.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN")
+    app.config["METRICS_DIR"] = os.getenv("METRICS_DIR")
+    app.config["METRICS_FLUSH_INTERVAL"] = int(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+    app.config["ENSURE_INDEXES"] = os.getenv("ENSURE_INDEXES", "true").lower() == "true"
 
-# Register blueprints
-app.register_blueprint(auth_bp, url_prefix="/api/auth")
-app.register_blueprint(user_bp, url_prefix="/api/users")
-app.register_blueprint(project_bp, url_prefix="/api/projects")
-app.register_blueprint(task_bp, url_prefix="/api/tasks")
+    app.config.update(config or {})
+
+    app.url_map.strict_slashes = False
+
+    # Before init_mongo, so the client reports its commands to the metrics.
+    init_metrics(app)
+    init_mongo(app)
+    get_response_cache().maxsize = app.config["RESPONSE_CACHE_SIZE"]
+
+    # Register blueprints
+    app.register_blueprint(auth_bp, url_prefix="/api/auth")
+    app.register_blueprint(user_bp, url_prefix="/api/users")
+    app.register_blueprint(project_bp, url_prefix="/api/projects")
+    app.register_blueprint(task_bp, url_prefix="/api/tasks")
+    app.register_blueprint(job_bp, url_prefix="/api/jobs")
+
+    app.register_error_handler(HashingPoolSaturated, server_busy)
+    app.register_error_handler(WaitQueueTimeoutError, server_busy)
+    app.add_url_rule("/api/health", view_func=health_check, methods=["GET"])
+
+    register_commands(app)
+
+    # Build any missing indexes declared by the models without delaying startup.
+    if app.config["ENSURE_INDEXES"]:
+        ensure_indexes_in_background(mongo.db)
+
+    return app
+
+
+def server_busy(e):
+    # Raised when the hashing or Mongo connection pool is saturated.
+    response = jsonify({"error": "Server busy, please retry"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
 
 
-@app.route("/api/health", methods=["GET"])
 def health_check():
-    return jsonify({"status": "healthy"}), 200
+    return jsonify({"status": "healthy", "mongo_pool": pool_stats()}), 200
 
 
+# Importing this module does not build an app: ``wsgi.py`` does for servers,
+# and the block below for the development server. Worker processes that
+# re-import ``__main__`` (e.g. the hashing pool) therefore build nothing.
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    create_app().run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,73 @@
+import click
+from flask.cli import AppGroup
+from extensions import mongo
+from models.task_counter import rebuild_task_counters
+from models.references import migrate_user_refs
+from models.user import backfill_user_search_keys
+from utils.indexes import ensure_indexes, index_drift
+from utils.jobs import resume_jobs
+
+users_cli = AppGroup("users", help="User maintenance commands.")
+indexes_cli = AppGroup("indexes", help="Index management commands.")
+tasks_cli = AppGroup("tasks", help="Task maintenance commands.")
+jobs_cli = AppGroup("jobs", help="Background job commands.")
+migrate_cli = AppGroup("migrate", help="Online data migrations.")
+
+
+@users_cli.command("backfill-search-keys")
+@click.option("--batch-size", default=1000, show_default=True)
+def backfill_search_keys_command(batch_size):
+    """Store normalized prefix-search keys on existing users."""
+    updated = backfill_user_search_keys(batch_size)
+    click.echo(f"Updated {updated} users")
+
+
+@indexes_cli.command("ensure")
+def ensure_indexes_command():
+    """Create every index declared by the models."""
+    for collection, names in ensure_indexes(mongo.db).items():
+        click.echo(f"{collection}: {', '.join(names)}")
+
+
+@indexes_cli.command("check")
+def check_indexes_command():
+    """Report missing, extra and redundant indexes; exit 1 on drift."""
+    drift = False
+    for collection, report in index_drift(mongo.db).items():
+        for kind, names in report.items():
+            for name in names:
+                drift = True
+                click.echo(f"{collection}: {kind} {name}")
+    if drift:
+        raise SystemExit(1)
+    click.echo("Indexes match the registry")
+
+
+@tasks_cli.command("rebuild-counters")
+def rebuild_counters_command():
+    """Recompute the per-project and per-assignee task counters."""
+    written = rebuild_task_counters()
+    click.echo(f"Rebuilt {written} task counters")
+
+
+@jobs_cli.command("resume")
+def resume_jobs_command():
+    """Run pending and interrupted background jobs to completion."""
+    ran = resume_jobs()
+    click.echo(f"Ran {ran} jobs")
+
+
+@migrate_cli.command("user-refs")
+@click.option("--batch-size", default=500, show_default=True)
+def migrate_user_refs_command(batch_size):
+    """Backfill assignee_id, owner_id and ObjectId project_id references."""
+    migrated = migrate_user_refs(batch_size)
+    click.echo(f"Updated {migrated['tasks']} tasks and {migrated['projects']} projects")
+
+
+def register_commands(app):
+    app.cli.add_command(users_cli)
+    app.cli.add_command(indexes_cli)
+    app.cli.add_command(tasks_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(migrate_cli)
@@ -3,7 +3,7 @@ from pathlib import Path
 import os
 import pytest
 import tempfile
-from app import app
+from wsgi import app
 from utils.database import (
     get_database,
     get_collection,
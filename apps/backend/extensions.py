@@ -1,3 +1,4 @@
 from flask_pymongo import PyMongo
 
+# Holds the shared client; bound by ``utils.database.init_mongo``.
 mongo = PyMongo()
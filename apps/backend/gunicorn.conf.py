@@ -0,0 +1,97 @@
+"""
+Gunicorn settings for the WorkHub API.
+
+Every value can be overridden from the environment, so load tests can sweep
+them without rebuilding the image:
+
+    GUNICORN_WORKERS        worker processes        default: CPU count
+    GUNICORN_THREADS        threads per worker      default: 4
+    GUNICORN_MAX_REQUESTS   requests before a worker is recycled (0 = never)
+                                                    default: 1000
+    GUNICORN_MAX_REQUESTS_JITTER                    default: 100
+    GUNICORN_TIMEOUT        seconds without a heartbeat before a worker is
+                            killed                  default: 60
+    GUNICORN_GRACEFUL_TIMEOUT                       default: 30
+    GUNICORN_KEEPALIVE      seconds                 default: 5
+    GUNICORN_PRELOAD        "true"/"false"          default: true
+    PORT                                            default: 5000
+
+Requests spend most of their time waiting on MongoDB, so each process runs a
+few threads (``gthread``) and there is one process per core to use every CPU
+despite the GIL. Password hashing runs in a separate process pool per worker;
+unless ``HASH_POOL_WORKERS`` is set, the cores are split between the workers
+so the pools together match the CPU count.
+
+Metrics are recorded per worker and merged through files in ``METRICS_DIR``
+(a fresh temporary directory unless set), so any worker can answer a scrape
+of ``/api/metrics`` for the whole server. Samples of recycled workers are
+folded into the totals when they exit.
+
+Each worker has its own Mongo pool: with ``W`` workers the server opens up to
+``W * MONGO_MAX_POOL_SIZE`` connections, and a worker rarely needs more than
+``GUNICORN_THREADS + JOB_WORKERS`` of them at once.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+cpu_count = multiprocessing.cpu_count()
+
+wsgi_app = "wsgi:application"
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", cpu_count))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+
+# Recycle workers gradually so slow leaks and fragmentation cannot build up;
+# the jitter keeps workers from restarting all at once.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+# Load the app once in the master so workers share its memory and the index
+# build starts once; the Mongo client is rebuilt in each worker (post_fork).
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+accesslog = "-"
+errorlog = "-"
+
+os.environ.setdefault("HASH_POOL_WORKERS", str(max(1, cpu_count // max(workers, 1))))
+
+# Only a directory created here is removed when the server stops.
+_own_metrics_dir = "METRICS_DIR" not in os.environ
+if _own_metrics_dir:
+    os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="workhub-metrics-")
+
+
+def post_fork(server, worker):
+    # A preloaded app holds the master's client; give the worker its own.
+    from utils.database import reset_after_fork
+
+    reset_after_fork()
+    server.log.info("Worker %s ready with its own Mongo client", worker.pid)
+
+
+def worker_exit(server, worker):
+    # Runs in the worker: write the samples recorded since the last flush.
+    from utils.metrics import flush_metrics
+
+    flush_metrics()
+
+
+def child_exit(server, worker):
+    # Runs in the master once the worker is gone.
+    from utils.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid, os.environ["METRICS_DIR"])
+
+
+def on_exit(server):
+    if _own_metrics_dir:
+        shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
@@ -0,0 +1,68 @@
+from extensions import mongo
+from bson import ObjectId
+from pymongo import UpdateOne
+from utils.response_cache import get_response_cache
+
+# A change version is an opaque token per scope, replaced by every write that
+# can change a list in that scope. List endpoints derive their ETag from the
+# versions of the scopes they read, so an unchanged list can be answered with
+# 304 from a single ``_id`` lookup here instead of re-running its query.
+#
+# Scopes:
+#   "projects"                  every project (and the project fields joined
+#                               into user task lists)
+#   "projects:owner:<email>"    the projects owned by a user
+#   "tasks:project:<id>"        the tasks of a project
+#   "tasks:assignee:<email>"    the tasks assigned to a user
+#   "users"                     the user directory
+#   "all"                       everything; bumped by data migrations
+ALL_SCOPE = "all"
+PROJECTS_SCOPE = "projects"
+USERS_SCOPE = "users"
+
+
+def owner_projects_scope(email):
+    return f"projects:owner:{email}"
+
+
+def project_tasks_scope(project_id):
+    return f"tasks:project:{project_id}"
+
+
+def assignee_tasks_scope(email):
+    return f"tasks:assignee:{email}"
+
+
+def task_scopes(*tasks):
+    """Scopes whose lists contain any of ``tasks`` (documents or None)."""
+    scopes = set()
+    for task in tasks:
+        if not task:
+            continue
+        if task.get("project_id") is not None:
+            scopes.add(project_tasks_scope(task["project_id"]))
+        if task.get("assignee") is not None:
+            scopes.add(assignee_tasks_scope(task["assignee"]))
+    return scopes
+
+
+def bump_versions(*scopes, session=None):
+    """
+    Give every scope in ``scopes`` a new version in one ``bulk_write`` and
+    drop the responses cached for them in this process.
+    """
+    operations = [
+        UpdateOne({"_id": scope}, {"$set": {"v": str(ObjectId())}}, upsert=True)
+        for scope in set(scopes)
+    ]
+    if operations:
+        mongo.db.change_versions.bulk_write(operations, ordered=False, session=session)
+        get_response_cache().invalidate(scopes)
+
+
+def get_versions(scopes):
+    """Return ``{scope: version}``; scopes never written have version "0"."""
+    versions = {scope: "0" for scope in scopes}
+    for doc in mongo.db.change_versions.find({"_id": {"$in": list(scopes)}}):
+        versions[doc["_id"]] = doc["v"]
+    return versions
@@ -0,0 +1,89 @@
+import datetime
+from extensions import mongo
+from bson import ObjectId
+from pymongo import ReturnDocument
+from utils.indexes import register_indexes
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# Finished jobs are kept for a week so clients can still poll their outcome.
+JOB_RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+register_indexes(
+    "jobs",
+    [("status", 1), ("created_at", 1)],
+    ([("finished_at", 1)], {"expireAfterSeconds": JOB_RETENTION_SECONDS}),
+)
+
+
+def create_job(job_type, params, created_by=None):
+    job = {
+        "type": job_type,
+        "params": params,
+        "status": JOB_PENDING,
+        "progress": {},
+        "checkpoint": None,
+        "attempts": 0,
+        "created_by": created_by,
+        "created_at": datetime.datetime.utcnow(),
+    }
+    result = mongo.db.jobs.insert_one(job)
+    job["_id"] = result.inserted_id
+    return job
+
+
+def get_job_by_id(job_id):
+    return mongo.db.jobs.find_one({"_id": ObjectId(job_id)})
+
+
+def claim_job(job_id, statuses=(JOB_PENDING,)):
+    """
+    Mark a job as running if it is in one of ``statuses``.
+
+    Returns:
+        dict: The claimed job, or None if another worker got it first
+    """
+    return mongo.db.jobs.find_one_and_update(
+        {"_id": ObjectId(job_id), "status": {"$in": list(statuses)}},
+        {
+            "$set": {"status": JOB_RUNNING, "started_at": datetime.datetime.utcnow()},
+            "$inc": {"attempts": 1},
+        },
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def update_job_progress(job_id, progress=None, checkpoint=None):
+    update = {"updated_at": datetime.datetime.utcnow()}
+    if progress is not None:
+        update["progress"] = progress
+    if checkpoint is not None:
+        update["checkpoint"] = checkpoint
+    return mongo.db.jobs.update_one({"_id": ObjectId(job_id)}, {"$set": update})
+
+
+def finish_job(job_id, result=None, error=None):
+    now = datetime.datetime.utcnow()
+    return mongo.db.jobs.update_one(
+        {"_id": ObjectId(job_id)},
+        {
+            "$set": {
+                "status": JOB_FAILED if error else JOB_COMPLETED,
+                "result": result,
+                "error": error,
+                "updated_at": now,
+                "finished_at": now,
+            }
+        },
+    )
+
+
+def get_unfinished_jobs():
+    return list(
+        mongo.db.jobs.find(
+            {"status": {"$in": [JOB_PENDING, JOB_RUNNING]}}, {"_id": 1}
+        ).sort("created_at", 1)
+    )
@@ -1,48 +1,122 @@
 from extensions import mongo
 import datetime
 from bson import ObjectId
+from models.change_version import (
+    bump_versions,
+    owner_projects_scope,
+    PROJECTS_SCOPE,
+)
+from models.references import as_object_id, user_id_for_email, read_by_id
+from utils.export import DEFAULT_EXPORT_BATCH_SIZE
+from utils.indexes import register_indexes
+from utils.pagination import paginate, COUNT_EXACT
+from utils.search import search_filter, SEARCH_CONTAINS, SEARCH_TEXT, TEXT_SCORE_SORT
 
+# Newest first; ``_id`` breaks ties so the order is total and cursors are stable.
+PROJECT_SORT = [("created_at", -1), ("_id", -1)]
+PROJECT_SEARCH_FIELDS = ["name", "description"]
+# Fields the project lists may return, and by default do.
+PROJECT_LIST_FIELDS = [
+    "_id",
+    "name",
+    "description",
+    "owner_email",
+    "owner_id",
+    "created_at",
+]
+PROJECT_EXPORT_FIELDS = ["_id", "name", "description", "owner_email", "created_at"]
 
-def create_project(name, description, owner_email):
+register_indexes(
+    "projects",
+    [("owner_email", 1), ("created_at", -1), ("_id", -1)],
+    [("owner_id", 1), ("created_at", -1), ("_id", -1)],
+    [("created_at", -1), ("_id", -1)],
+    (
+        [("name", "text"), ("description", "text")],
+        {"name": "projects_text", "weights": {"name": 5, "description": 1}},
+    ),
+)
+
+
+def create_project(name, description, owner_email, owner_id=None):
     project = {
         "name": name,
         "description": description,
         "owner_email": owner_email,
+        "owner_id": as_object_id(owner_id) or user_id_for_email(owner_email),
         "created_at": datetime.datetime.utcnow(),
     }
     mongo.db.projects.insert_one(project)
+    bump_versions(PROJECTS_SCOPE, owner_projects_scope(owner_email))
 
 
-def get_projects_by_owner(owner_email, page=1, limit=10, search=None):
-    query = {"owner_email": owner_email}
-    if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-        ]
+def get_projects_by_owner(
+    owner_email,
+    page=1,
+    limit=10,
+    search=None,
+    cursor=None,
+    count=COUNT_EXACT,
+    search_mode=SEARCH_CONTAINS,
+    owner_id=None,
+    fields=None,
+):
+    if read_by_id(owner_id):
+        query = {"owner_id": as_object_id(owner_id)}
+    else:
+        query = {"owner_email": owner_email}
+    return _find_projects(
+        query, page, limit, search, cursor, count, search_mode, fields
+    )
+
 
-    cursor = mongo.db.projects.find(query).skip((page - 1) * limit).limit(limit)
-    projects = list(cursor)
-    return projects
+def get_all_projects(
+    page=1,
+    limit=10,
+    search=None,
+    cursor=None,
+    count=COUNT_EXACT,
+    search_mode=SEARCH_CONTAINS,
+    fields=None,
+):
+    return _find_projects({}, page, limit, search, cursor, count, search_mode, fields)
 
 
-def get_all_projects(page=1, limit=10, search=None):
-    query = {}
+def _find_projects(query, page, limit, search, cursor, count, search_mode, fields=None):
+    sort = PROJECT_SORT
     if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-        ]
+        query.update(search_filter(search, PROJECT_SEARCH_FIELDS, search_mode))
+        if search_mode == SEARCH_TEXT:
+            sort = TEXT_SCORE_SORT
 
-    cursor = mongo.db.projects.find(query).skip((page - 1) * limit).limit(limit)
-    projects = list(cursor)
-    return projects
+    return paginate(
+        mongo.db.projects,
+        query,
+        sort,
+        limit,
+        page,
+        cursor,
+        count,
+        projection=fields or PROJECT_LIST_FIELDS,
+    )
+
+
+def export_all_projects(batch_size=DEFAULT_EXPORT_BATCH_SIZE):
+    """Cursor over every project, newest first, for streaming."""
+    return (
+        mongo.db.projects.find({}, {field: 1 for field in PROJECT_EXPORT_FIELDS})
+        .sort(PROJECT_SORT)
+        .batch_size(batch_size)
+    )
 
 
 def delete_project(project_id, owner_email):
-    return mongo.db.projects.delete_one(
+    result = mongo.db.projects.delete_one(
         {"_id": ObjectId(project_id), "owner_email": owner_email}
     )
+    if result.deleted_count:
+        bump_versions(PROJECTS_SCOPE, owner_projects_scope(owner_email))
+    return result
 
 
 def update_project(project_id, owner_email, updated_fields):
@@ -51,7 +125,10 @@ def update_project(project_id, owner_email, updated_fields):
     if not updated_fields:
         return None  # or raise an error, depending on your style
 
-    return mongo.db.projects.update_one(
+    result = mongo.db.projects.update_one(
         {"_id": ObjectId(project_id), "owner_email": owner_email},
         {"$set": updated_fields},
     )
+    if result.modified_count:
+        bump_versions(PROJECTS_SCOPE, owner_projects_scope(owner_email))
+    return result
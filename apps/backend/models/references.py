@@ -0,0 +1,155 @@
+from extensions import mongo
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import current_app
+from pymongo import UpdateOne
+from models.change_version import bump_versions, ALL_SCOPE
+from utils.cascade import DEFAULT_BATCH_SIZE
+
+# Tasks and projects are moving from email/string references to ObjectIds:
+#   tasks.assignee (email)        -> tasks.assignee_id (users._id)
+#   tasks.project_id (str)        -> tasks.project_id (ObjectId)
+#   projects.owner_email (email)  -> projects.owner_id (users._id)
+# New writes store both forms, ``flask migrate user-refs`` backfills existing
+# documents, and reads switch to the ids once ``READ_USER_REFS_BY_ID`` is set.
+
+
+def as_object_id(value):
+    """Return ``value`` as an ObjectId, or None if it is not a valid one."""
+    if isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+
+def user_id_for_email(email):
+    user = mongo.db.users.find_one({"email": email}, {"_id": 1}) if email else None
+    return user["_id"] if user else None
+
+
+def read_by_id(user_id):
+    """True when reads should use ``assignee_id``/``owner_id`` for ``user_id``."""
+    return (
+        current_app.config.get("READ_USER_REFS_BY_ID", False)
+        and as_object_id(user_id) is not None
+    )
+
+
+def project_id_filter(project_id):
+    """
+    Match a task's ``project_id`` whether it is stored as an ObjectId or,
+    for documents the migration has not reached yet, as a string.
+    """
+    oid = as_object_id(project_id)
+    if oid is None:
+        return project_id
+    return {"$in": [oid, str(oid)]}
+
+
+def user_ids_by_email(emails):
+    """Map each of ``emails`` that belongs to a user to that user's ``_id``."""
+    emails = [email for email in set(emails) if email]
+    if not emails:
+        return {}
+    return {
+        user["email"]: user["_id"]
+        for user in mongo.db.users.find({"email": {"$in": emails}}, {"email": 1})
+    }
+
+
+def link_user_refs(email, user_id):
+    """
+    Point the tasks and projects of ``email`` that have no user id yet at
+    ``user_id``, e.g. tasks assigned to someone before they registered.
+
+    Returns:
+        int: Number of tasks and projects updated
+    """
+    tasks = mongo.db.tasks.update_many(
+        {"assignee": email, "assignee_id": None}, {"$set": {"assignee_id": user_id}}
+    )
+    projects = mongo.db.projects.update_many(
+        {"owner_email": email, "owner_id": None}, {"$set": {"owner_id": user_id}}
+    )
+    linked = tasks.modified_count + projects.modified_count
+    # Linked documents serialize differently, so their lists are stale.
+    if linked:
+        bump_versions(ALL_SCOPE)
+    return linked
+
+
+def _migrate_batch(collection, documents, email_field, id_field):
+    ids_by_email = user_ids_by_email(doc.get(email_field) for doc in documents)
+    operations = []
+    for doc in documents:
+        update = {}
+        user_id = ids_by_email.get(doc.get(email_field))
+        # None marks emails without a user as processed; they are linked once
+        # a user with that email exists.
+        if id_field not in doc or (doc[id_field] is None and user_id is not None):
+            update[id_field] = user_id
+        if isinstance(doc.get("project_id"), str):
+            oid = as_object_id(doc["project_id"])
+            if oid is not None:
+                update["project_id"] = oid
+        if update:
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+    if operations:
+        return collection.bulk_write(operations, ordered=False).modified_count
+    return 0
+
+
+def _migrate_collection(collection, query, fields, email_field, id_field, batch_size):
+    migrated = 0
+    last_id = None
+    while True:
+        batch_query = query if last_id is None else {**query, "_id": {"$gt": last_id}}
+        documents = list(
+            collection.find(batch_query, fields).sort("_id", 1).limit(batch_size)
+        )
+        if not documents:
+            return migrated
+        migrated += _migrate_batch(collection, documents, email_field, id_field)
+        last_id = documents[-1]["_id"]
+
+
+def migrate_user_refs(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Backfill ``assignee_id``, ``owner_id`` and ObjectId ``project_id``.
+
+    Runs online in ``_id`` order with one ``bulk_write`` per batch. Documents
+    already migrated are skipped, so it can be interrupted and run again;
+    references still null are retried, in case their user has registered.
+
+    Returns:
+        dict: Number of tasks and projects updated
+    """
+    migrated = {
+        "tasks": _migrate_collection(
+            mongo.db.tasks,
+            {
+                "$or": [
+                    {"assignee_id": None},
+                    {"project_id": {"$type": "string"}},
+                ]
+            },
+            {"assignee": 1, "assignee_id": 1, "project_id": 1},
+            "assignee",
+            "assignee_id",
+            batch_size,
+        ),
+        "projects": _migrate_collection(
+            mongo.db.projects,
+            {"owner_id": None},
+            {"owner_email": 1, "owner_id": 1},
+            "owner_email",
+            "owner_id",
+            batch_size,
+        ),
+    }
+    # Migrated documents serialize differently, so every list is stale.
+    if any(migrated.values()):
+        bump_versions(ALL_SCOPE)
+    return migrated
@@ -0,0 +1,64 @@
+import datetime
+import hashlib
+import secrets
+from extensions import mongo
+from utils.indexes import register_indexes
+
+# Documents are keyed by the SHA-256 of the token, so the raw token is never
+# stored and lookups are a single ``_id`` hit. The TTL index lets MongoDB
+# purge expired tokens on its own.
+register_indexes(
+    "refresh_tokens",
+    ([("expires_at", 1)], {"expireAfterSeconds": 0}),
+    [("user_id", 1)],
+)
+
+
+def _token_id(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(claims, ttl):
+    """
+    Store a new refresh token carrying ``claims`` for ``ttl`` and return it.
+
+    Args:
+        claims (dict): Access token claims (id, email, full_name, role)
+        ttl (datetime.timedelta): Lifetime of the refresh token
+    """
+    token = secrets.token_urlsafe(32)
+    now = datetime.datetime.utcnow()
+    mongo.db.refresh_tokens.insert_one(
+        {
+            "_id": _token_id(token),
+            "user_id": claims.get("id"),
+            "claims": claims,
+            "created_at": now,
+            "expires_at": now + ttl,
+        }
+    )
+    return token
+
+
+def rotate_refresh_token(token, ttl):
+    """
+    Consume ``token`` and issue its replacement.
+
+    Returns:
+        tuple: (claims, new_token), or None if the token is unknown, expired
+        or was already used
+    """
+    record = mongo.db.refresh_tokens.find_one_and_delete(
+        {"_id": _token_id(token), "expires_at": {"$gt": datetime.datetime.utcnow()}}
+    )
+    if not record:
+        return None
+    return record["claims"], issue_refresh_token(record["claims"], ttl)
+
+
+def revoke_refresh_token(token):
+    return mongo.db.refresh_tokens.delete_one({"_id": _token_id(token)})
+
+
+def revoke_user_refresh_tokens(user_id):
+    return mongo.db.refresh_tokens.delete_many({"user_id": str(user_id)})
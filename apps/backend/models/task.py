@@ -1,96 +1,573 @@
 import datetime
 from extensions import mongo
-import re
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from models.task_counter import (
+    apply_task_change,
+    apply_task_changes,
+    add_tasks,
+    subtract_counts,
+    get_counters,
+    project_counter_id,
+    assignee_counter_id,
+)
+from models.change_version import bump_versions, task_scopes
+from models.references import (
+    as_object_id,
+    user_id_for_email,
+    user_ids_by_email,
+    read_by_id,
+    project_id_filter,
+)
+from utils.cascade import delete_in_batches, DEFAULT_BATCH_SIZE
+from utils.export import DEFAULT_EXPORT_BATCH_SIZE
+from utils.indexes import register_indexes
+from utils.pagination import paginate, COUNT_EXACT
+from utils.search import search_filter, SEARCH_CONTAINS, SEARCH_TEXT, TEXT_SCORE_SORT
 
+# Allowed ``sort`` values for task lists. Every order ends with ``_id`` so it is
+# total, which keeps pages deterministic and cursors stable while tasks change.
+TASK_SORTS = {
+    "created_at": [("created_at", -1), ("_id", -1)],
+    "status": [("status", 1), ("created_at", -1), ("_id", -1)],
+    "priority": [("priority", -1), ("created_at", -1), ("_id", -1)],
+}
+DEFAULT_TASK_SORT = "created_at"
+TASK_SEARCH_FIELDS = ["title", "description"]
+# Fields the task lists may return, and by default do: the columns of the
+# task table. User task lists add the joined project fields.
+TASK_LIST_FIELDS = [
+    "_id",
+    "title",
+    "description",
+    "status",
+    "priority",
+    "project_id",
+    "assignee",
+    "assignee_id",
+    "created_at",
+]
+USER_TASK_LIST_FIELDS = TASK_LIST_FIELDS + ["project_name", "project_owner"]
+# Joins each task of a page with the name and owner of its project. The string
+# ``project_id`` is converted so the lookup hits the projects ``_id`` index.
+PROJECT_LOOKUP_STAGES = [
+    {
+        "$addFields": {
+            "project_oid": {
+                "$convert": {
+                    "input": "$project_id",
+                    "to": "objectId",
+                    "onError": None,
+                    "onNull": None,
+                }
+            }
+        }
+    },
+    {
+        "$lookup": {
+            "from": "projects",
+            "localField": "project_oid",
+            "foreignField": "_id",
+            "as": "project",
+        }
+    },
+    {
+        "$addFields": {
+            "project_name": {"$arrayElemAt": ["$project.name", 0]},
+            "project_owner": {"$arrayElemAt": ["$project.owner_email", 0]},
+        }
+    },
+    {"$project": {"project": 0, "project_oid": 0}},
+]
 
-def create_task(title, description, project_id, assignee_email):
+# Fields the per-project/per-assignee counters depend on.
+COUNTER_FIELDS = {"project_id": 1, "assignee": 1, "status": 1}
+UPDATABLE_TASK_FIELDS = {"title", "description", "assignee", "status", "priority"}
+# Filters accepted by bulk updates; one of the scoping fields is required.
+BULK_FILTER_FIELDS = ("project_id", "assignee", "status")
+BULK_SCOPE_FIELDS = ("project_id", "assignee")
+TASK_EXPORT_FIELDS = [
+    "_id",
+    "title",
+    "description",
+    "status",
+    "priority",
+    "project_id",
+    "assignee",
+    "created_at",
+]
+
+# One index per list scope (project or assignee) and sort order, so pages are
+# read in index order whichever ``sort`` and ``status`` filter is used.
+register_indexes(
+    "tasks",
+    [("project_id", 1), ("created_at", -1), ("_id", -1)],
+    [("project_id", 1), ("status", 1), ("created_at", -1), ("_id", -1)],
+    [("project_id", 1), ("priority", -1), ("created_at", -1), ("_id", -1)],
+    [("assignee", 1), ("created_at", -1), ("_id", -1)],
+    [("assignee", 1), ("status", 1), ("created_at", -1), ("_id", -1)],
+    [("assignee", 1), ("priority", -1), ("created_at", -1), ("_id", -1)],
+    [("assignee_id", 1), ("created_at", -1), ("_id", -1)],
+    [("assignee_id", 1), ("status", 1), ("created_at", -1), ("_id", -1)],
+    [("assignee_id", 1), ("priority", -1), ("created_at", -1), ("_id", -1)],
+    (
+        [("title", "text"), ("description", "text")],
+        {"name": "tasks_text", "weights": {"title": 5, "description": 1}},
+    ),
+)
+
+
+def _new_task(title, description, project_id, assignee_email, assignee_id, priority):
     task = {
         "title": title,
         "description": description,
-        "project_id": project_id,
+        "project_id": as_object_id(project_id) or project_id,
         "assignee": assignee_email,
+        "assignee_id": assignee_id,
         "status": "open",
         "created_at": datetime.datetime.utcnow(),
     }
+    if priority is not None:
+        task["priority"] = priority
+    return task
+
+
+def create_task(title, description, project_id, assignee_email, priority=None):
+    task = _new_task(
+        title,
+        description,
+        project_id,
+        assignee_email,
+        user_id_for_email(assignee_email),
+        priority,
+    )
     mongo.db.tasks.insert_one(task)
+    apply_task_change(after=task)
+    bump_versions(*task_scopes(task))
+
+
+def create_tasks(tasks, ordered=True):
+    """
+    Insert many tasks with one ``insert_many``.
+
+    In ordered mode the insert stops at the first failing task; unordered
+    mode attempts every task.
 
+    Args:
+        tasks (list): Dicts with ``title``, ``description``, ``project_id``,
+            ``assignee`` and optionally ``priority``
+        ordered (bool): Whether to stop at the first error
 
-def get_tasks_by_project(project_id, search="", status="", page=1, per_page=10):
-    query = {"project_id": project_id}
+    Returns:
+        list: Per task, ``{"_id": id}`` if inserted, ``{"error": message}``
+        if it failed, or None if it was not attempted
+    """
+    ids_by_email = user_ids_by_email(task["assignee"] for task in tasks)
+    documents = [
+        _new_task(
+            task["title"],
+            task["description"],
+            task["project_id"],
+            task["assignee"],
+            ids_by_email.get(task["assignee"]),
+            task.get("priority"),
+        )
+        for task in tasks
+    ]
+
+    errors = {}
+    try:
+        mongo.db.tasks.insert_many(documents, ordered=ordered)
+    except BulkWriteError as e:
+        errors = {
+            error["index"]: error["errmsg"]
+            for error in e.details.get("writeErrors", [])
+        }
+    first_error = min(errors, default=len(documents))
+
+    results = []
+    created = []
+    for index, document in enumerate(documents):
+        if index in errors:
+            results.append({"error": errors[index]})
+        elif ordered and index > first_error:
+            results.append(None)
+        else:
+            results.append({"_id": document["_id"]})
+            created.append(document)
+
+    if created:
+        add_tasks(created)
+        bump_versions(*task_scopes(*created))
+    return results
+
+
+def get_tasks_by_project(
+    project_id,
+    search="",
+    status="",
+    page=1,
+    per_page=10,
+    cursor=None,
+    sort=DEFAULT_TASK_SORT,
+    count=COUNT_EXACT,
+    search_mode=SEARCH_CONTAINS,
+    fields=None,
+):
+    query = {"project_id": project_id_filter(project_id)}
 
     if status:
         query["status"] = status
 
-    if search:
-        regex = re.compile(re.escape(search), re.IGNORECASE)
-        query["$or"] = [{"title": regex}, {"description": regex}]
-
-    skip_count = (page - 1) * per_page
+    result = _find_tasks(
+        query,
+        search,
+        search_mode,
+        sort,
+        page,
+        per_page,
+        cursor,
+        count,
+        fields=fields or TASK_LIST_FIELDS,
+    )
 
-    cursor = mongo.db.tasks.find(query).skip(skip_count).limit(per_page)
-    tasks = list(cursor)
+    return result
 
-    # Convert ObjectId to string
-    for task in tasks:
-        task["_id"] = str(task["_id"])
 
-    total = mongo.db.tasks.count_documents(query)
+def _find_tasks(
+    query,
+    search,
+    search_mode,
+    sort,
+    page,
+    per_page,
+    cursor,
+    count,
+    stages=None,
+    fields=None,
+):
+    sort_spec = TASK_SORTS[sort]
+    if search:
+        query.update(search_filter(search, TASK_SEARCH_FIELDS, search_mode))
+        if search_mode == SEARCH_TEXT:
+            sort_spec = TEXT_SCORE_SORT
 
-    return tasks, total
+    return paginate(
+        mongo.db.tasks,
+        query,
+        sort_spec,
+        per_page,
+        page,
+        cursor,
+        count,
+        stages,
+        fields,
+    )
 
 
 def update_task_status(task_id, status):
-    from bson import ObjectId
-
-    return mongo.db.tasks.update_one(
-        {"_id": ObjectId(task_id)}, {"$set": {"status": status}}
+    """Set a task's status; returns the number of tasks modified (0 or 1)."""
+    before = mongo.db.tasks.find_one_and_update(
+        {"_id": ObjectId(task_id)},
+        {"$set": {"status": status}},
+        projection=COUNTER_FIELDS,
+        return_document=ReturnDocument.BEFORE,
     )
+    if not before or before.get("status") == status:
+        return 0
+
+    apply_task_change(before, {**before, "status": status})
+    bump_versions(*task_scopes(before))
+    return 1
 
 
 def delete_task(task_id):
-    from bson import ObjectId
+    """Delete a task; returns the number of tasks deleted (0 or 1)."""
+    before = mongo.db.tasks.find_one_and_delete(
+        {"_id": ObjectId(task_id)}, projection=COUNTER_FIELDS
+    )
+    if not before:
+        return 0
+
+    apply_task_change(before=before)
+    bump_versions(*task_scopes(before))
+    return 1
+
+
+def subtract_deleted_tasks(tasks, session=None):
+    """
+    Take deleted ``tasks`` (with ``COUNTER_FIELDS``) out of the counters and
+    invalidate the lists they were in.
+    """
+    subtract_counts([{**task, "count": 1} for task in tasks], session)
+    bump_versions(*task_scopes(*tasks), session=session)
 
-    return mongo.db.tasks.delete_one({"_id": ObjectId(task_id)})
 
+def task_cascade_step(query):
+    """A :func:`utils.cascade.cascade_delete` step deleting the tasks in ``query``."""
+    return ("tasks", mongo.db.tasks, query, COUNTER_FIELDS, subtract_deleted_tasks)
 
-def get_user_tasks(user_email, search="", status="", page=1, per_page=10):
-    query = {"assignee": user_email}
+
+def delete_tasks_by_assignee(email, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Delete every task assigned to ``email`` in batches, keeping the counters
+    in step with each batch.
+
+    Returns:
+        int: Number of tasks deleted
+    """
+    return delete_in_batches(
+        mongo.cx,
+        mongo.db.tasks,
+        {"assignee": email},
+        batch_size,
+        COUNTER_FIELDS,
+        subtract_deleted_tasks,
+        progress,
+    )
+
+
+def get_user_tasks(
+    user_email,
+    search="",
+    status="",
+    page=1,
+    per_page=10,
+    cursor=None,
+    sort=DEFAULT_TASK_SORT,
+    count=COUNT_EXACT,
+    search_mode=SEARCH_CONTAINS,
+    user_id=None,
+    fields=None,
+):
+    if read_by_id(user_id):
+        query = {"assignee_id": as_object_id(user_id)}
+    else:
+        query = {"assignee": user_email}
 
     if status:
         query["status"] = status
 
-    if search:
-        regex = re.compile(re.escape(search), re.IGNORECASE)
-        query["$or"] = [{"title": regex}, {"description": regex}]
+    result = _find_tasks(
+        query,
+        search,
+        search_mode,
+        sort,
+        page,
+        per_page,
+        cursor,
+        count,
+        PROJECT_LOOKUP_STAGES,
+        fields or USER_TASK_LIST_FIELDS,
+    )
 
-    skip_count = (page - 1) * per_page
+    return result
 
-    cursor = mongo.db.tasks.find(query).skip(skip_count).limit(per_page)
-    tasks = list(cursor)
 
-    # mapping to simple numbers
-    project_ids = list({task["project_id"] for task in tasks})
-    project_id_map = {pid: str(i + 1) for i, pid in enumerate(project_ids)}
+def _update_fields(updates, assignee_ids=None):
+    update_fields = {
+        key: value for key, value in updates.items() if key in UPDATABLE_TASK_FIELDS
+    }
+    if "assignee" in update_fields:
+        email = update_fields["assignee"]
+        update_fields["assignee_id"] = (
+            assignee_ids.get(email)
+            if assignee_ids is not None
+            else user_id_for_email(email)
+        )
+    return update_fields
+
+
+def _export_cursor(query, batch_size):
+    return (
+        mongo.db.tasks.find(query, {field: 1 for field in TASK_EXPORT_FIELDS})
+        .sort(TASK_SORTS[DEFAULT_TASK_SORT])
+        .batch_size(batch_size)
+    )
 
-    for task in tasks:
-        task["_id"] = str(task["_id"])
-        task["project_id"] = project_id_map.get(task["project_id"], "0")
 
-    total = mongo.db.tasks.count_documents(query)
+def export_project_tasks(project_id, batch_size=DEFAULT_EXPORT_BATCH_SIZE):
+    """Cursor over every task of a project, newest first, for streaming."""
+    return _export_cursor({"project_id": project_id_filter(project_id)}, batch_size)
 
-    return tasks, total
+
+def export_user_tasks(user_email, user_id=None, batch_size=DEFAULT_EXPORT_BATCH_SIZE):
+    """Cursor over every task assigned to a user, newest first, for streaming."""
+    if read_by_id(user_id):
+        query = {"assignee_id": as_object_id(user_id)}
+    else:
+        query = {"assignee": user_email}
+    return _export_cursor(query, batch_size)
 
 
 def update_task(task_id, updates):
-    allowed_fields = {"title", "description", "assignee", "status"}
-    update_fields = {
-        key: value for key, value in updates.items() if key in allowed_fields
+    update_fields = _update_fields(updates)
+
+    if not update_fields:
+        return None
+
+    before = mongo.db.tasks.find_one_and_update(
+        {"_id": ObjectId(task_id)},
+        {"$set": update_fields},
+        projection={**COUNTER_FIELDS, **{key: 1 for key in update_fields}},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if not before:
+        return 0
+
+    after = {**before, **update_fields}
+    if any(before.get(key) != after.get(key) for key in ("assignee", "status")):
+        apply_task_change(before, after)
+    modified = any(before.get(key) != value for key, value in update_fields.items())
+    if modified:
+        bump_versions(*task_scopes(before, after))
+    return int(modified)
+
+
+def bulk_update_tasks(operations):
+    """
+    Apply many ``{"task_id", "updates"}`` pairs with one ``bulk_write``.
+
+    The tasks are read once beforehand so counters, change versions and the
+    per-operation results can be worked out without another round trip.
+    Operations run in order, so the last update of a task wins.
+
+    Returns:
+        tuple: (results, BulkWriteResult or None). Each result holds the
+        ``matched`` and ``modified`` count of its operation, or an ``error``
+    """
+    results = []
+    requests = []
+    ids_by_email = user_ids_by_email(
+        (operation.get("updates") or {}).get("assignee") for operation in operations
+    )
+    for operation in operations:
+        task_id = as_object_id(operation.get("task_id"))
+        update_fields = _update_fields(operation.get("updates") or {}, ids_by_email)
+        if task_id is None:
+            results.append({"error": "Invalid task_id"})
+        elif not update_fields:
+            results.append({"error": "No valid fields to update"})
+        else:
+            results.append(None)
+            requests.append((len(results) - 1, task_id, update_fields))
+
+    if not requests:
+        return results, None
+
+    fields = {key for _, _, update_fields in requests for key in update_fields}
+    before_by_id = {
+        task["_id"]: task
+        for task in mongo.db.tasks.find(
+            {"_id": {"$in": [task_id for _, task_id, _ in requests]}},
+            {**COUNTER_FIELDS, **{key: 1 for key in fields}},
+        )
     }
+    result = mongo.db.tasks.bulk_write(
+        [
+            UpdateOne({"_id": task_id}, {"$set": update_fields})
+            for _, task_id, update_fields in requests
+        ],
+        # Operations on the same task must apply in request order, which is
+        # also the order the results below assume.
+        ordered=True,
+    )
+
+    # Later operations on the same task see the state left by earlier ones.
+    changes = []
+    scopes = set()
+    for index, task_id, update_fields in requests:
+        before = before_by_id.get(task_id)
+        if before is None:
+            results[index] = {"matched": 0, "modified": 0}
+            continue
+        after = {**before, **update_fields}
+        modified = any(before.get(key) != value for key, value in update_fields.items())
+        results[index] = {"matched": 1, "modified": int(modified)}
+        if modified:
+            changes.append((before, after, 1))
+            scopes |= task_scopes(before, after)
+        before_by_id[task_id] = after
+
+    apply_task_changes(changes)
+    bump_versions(*scopes)
+    return results, result
+
+
+def update_tasks_matching(match, updates):
+    """
+    Apply ``updates`` to every task matching ``match``.
 
+    Matching tasks are updated one counter state (project, assignee, status)
+    at a time, so the task counters move by exactly the number of tasks
+    updated. Tasks that start matching after the initial read are left alone.
+
+    Args:
+        match (dict): Values for ``BULK_FILTER_FIELDS``; ``project_id`` or
+            ``assignee`` is required
+        updates (dict): Fields to set, limited to ``UPDATABLE_TASK_FIELDS``
+
+    Returns:
+        dict: ``matched`` and ``modified`` counts, or None if ``updates`` has
+        no valid fields
+
+    Raises:
+        ValueError: If ``match`` does not name a project or an assignee
+    """
+    if not any(match.get(field) for field in BULK_SCOPE_FIELDS):
+        raise ValueError("filter needs a project_id or an assignee")
+    update_fields = _update_fields(updates)
     if not update_fields:
         return None
 
-    return mongo.db.tasks.update_one(
-        {"_id": ObjectId(task_id)}, {"$set": update_fields}
+    query = {field: match[field] for field in BULK_FILTER_FIELDS if match.get(field)}
+    if "project_id" in query:
+        query["project_id"] = project_id_filter(query["project_id"])
+
+    # Group the matching tasks by counter fields to move their counts.
+    groups = list(
+        mongo.db.tasks.aggregate(
+            [
+                {"$match": query},
+                {
+                    "$group": {
+                        "_id": {key: f"${key}" for key in COUNTER_FIELDS},
+                        "count": {"$sum": 1},
+                    }
+                },
+            ]
+        )
     )
+    # Each group is updated on its own, with its counter fields in the filter,
+    # so the counts moved are the tasks actually updated out of that state
+    # rather than what the aggregation saw before a concurrent write.
+    changes = []
+    scopes = set()
+    matched = modified = 0
+    for group in groups:
+        before = group["_id"]
+        group_query = {
+            **query,
+            **{key: before.get(key) for key in COUNTER_FIELDS},
+        }
+        result = mongo.db.tasks.update_many(group_query, {"$set": update_fields})
+        if not result.matched_count:
+            continue
+        matched += result.matched_count
+        modified += result.modified_count
+        after = {**before, **update_fields}
+        changes.append((before, after, result.matched_count))
+        scopes |= task_scopes(before, after)
+    apply_task_changes(changes)
+    if modified:
+        bump_versions(*scopes)
+    return {"matched": matched, "modified": modified}
+
+
+def get_project_task_stats(project_id):
+    return get_counters(project_counter_id(project_id))
+
+
+def get_user_task_stats(user_email):
+    return get_counters(assignee_counter_id(user_email))
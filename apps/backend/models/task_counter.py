@@ -0,0 +1,205 @@
+import datetime
+from extensions import mongo
+from pymongo import UpdateOne
+from utils.cascade import in_transaction
+
+# Counter documents live in ``task_counters`` and are keyed by scope:
+#   {"_id": "project:<project_id>", "total": 12, "status": {"open": 7, ...}}
+#   {"_id": "assignee:<email>", "total": 3, "status": {"completed": 3}}
+
+
+def project_counter_id(project_id):
+    return f"project:{project_id}"
+
+
+def assignee_counter_id(email):
+    return f"assignee:{email}"
+
+
+def _counter_ids(task):
+    ids = []
+    if task.get("project_id") is not None:
+        ids.append(project_counter_id(task["project_id"]))
+    if task.get("assignee") is not None:
+        ids.append(assignee_counter_id(task["assignee"]))
+    return ids
+
+
+def _increments(task, delta):
+    inc = {"total": delta}
+    if task.get("status"):
+        inc[f"status.{task['status']}"] = delta
+    return inc
+
+
+def _collect(changes, task, delta):
+    for counter_id in _counter_ids(task):
+        inc = changes.setdefault(counter_id, {})
+        for field, value in _increments(task, delta).items():
+            inc[field] = inc.get(field, 0) + value
+
+
+def _flush(changes, session=None):
+    operations = []
+    for counter_id, inc in changes.items():
+        inc = {field: value for field, value in inc.items() if value}
+        if inc:
+            update = {"$inc": inc, "$currentDate": {"updated_at": True}}
+            operations.append(UpdateOne({"_id": counter_id}, update, upsert=True))
+    if operations:
+        mongo.db.task_counters.bulk_write(operations, ordered=False, session=session)
+
+
+def apply_task_change(before=None, after=None):
+    """
+    Move the counters from the ``before`` state of a task to its ``after`` state.
+
+    Pass only ``after`` for a created task and only ``before`` for a deleted
+    one. Both documents need ``project_id``, ``assignee`` and ``status``.
+    All affected counters are updated in a single ``bulk_write``.
+    """
+    changes = {}
+    if before:
+        _collect(changes, before, -1)
+    if after:
+        _collect(changes, after, 1)
+    _flush(changes)
+
+
+def apply_task_changes(changes):
+    """
+    Apply many task changes with a single ``bulk_write``.
+
+    Args:
+        changes (list): ``(before, after, count)`` tuples, as for
+            :func:`apply_task_change`, each standing for ``count`` tasks
+    """
+    totals = {}
+    for before, after, count in changes:
+        if before:
+            _collect(totals, before, -count)
+        if after:
+            _collect(totals, after, count)
+    _flush(totals)
+
+
+def add_tasks(tasks):
+    """Count newly inserted ``tasks`` with a single ``bulk_write``."""
+    changes = {}
+    for task in tasks:
+        _collect(changes, task, 1)
+    _flush(changes)
+
+
+def subtract_counts(counts, session=None):
+    """
+    Subtract grouped task counts, e.g. after a ``delete_many`` on tasks.
+
+    Args:
+        counts (list): Items of ``{"project_id", "assignee", "status", "count"}``
+        session (ClientSession, optional): Session of an enclosing transaction
+    """
+    changes = {}
+    for group in counts:
+        _collect(changes, group, -group["count"])
+    _flush(changes, session)
+
+
+def rename_assignee_counters(old_email, new_email):
+    """
+    Fold the counters of ``old_email`` into those of ``new_email``.
+
+    The counts read from the old counter are added to the new one before they
+    are subtracted from the old one, and both run in one transaction where the
+    deployment supports it. Without transactions an interrupted fold can only
+    count tasks twice, never lose them; ``flask tasks rebuild-counters``
+    repairs that.
+    """
+    old_id = assignee_counter_id(old_email)
+
+    def fold(session):
+        counter = mongo.db.task_counters.find_one({"_id": old_id}, session=session)
+        if not counter:
+            return
+        inc = {"total": counter.get("total", 0)}
+        for status, count in counter.get("status", {}).items():
+            inc[f"status.{status}"] = count
+        _flush({assignee_counter_id(new_email): inc}, session)
+        # Subtract rather than delete, so tasks counted for the old email
+        # since it was read stay counted.
+        _flush({old_id: {field: -value for field, value in inc.items()}}, session)
+        mongo.db.task_counters.delete_one(
+            {"_id": old_id, "total": {"$lte": 0}}, session=session
+        )
+
+    in_transaction(mongo.cx, fold)
+
+
+def get_counters(counter_id):
+    counter = mongo.db.task_counters.find_one({"_id": counter_id}) or {}
+    return {
+        "total": counter.get("total", 0),
+        "by_status": {
+            status: count
+            for status, count in counter.get("status", {}).items()
+            if count
+        },
+    }
+
+
+def rebuild_task_counters(batch_size=1000):
+    """
+    Recompute every counter document from the tasks collection.
+
+    Counters are replaced in place and stale ones removed afterwards, so
+    readers never observe an empty counter collection while this runs.
+
+    Returns:
+        int: Number of counter documents written
+    """
+    rebuilt_at = datetime.datetime.utcnow()
+    counters = {}
+    for scope, field in (("project", "project_id"), ("assignee", "assignee")):
+        pipeline = [
+            {"$match": {field: {"$ne": None}}},
+            {
+                "$group": {
+                    "_id": {"key": f"${field}", "status": "$status"},
+                    "n": {"$sum": 1},
+                }
+            },
+        ]
+        # A project id stored as a string and as an ObjectId forms two groups
+        # with the same counter id, so counts are added up, not assigned.
+        for group in mongo.db.tasks.aggregate(pipeline, allowDiskUse=True):
+            counter_id = f"{scope}:{group['_id']['key']}"
+            counter = counters.setdefault(
+                counter_id, {"total": 0, "status": {}, "rebuilt_at": rebuilt_at}
+            )
+            counter["total"] += group["n"]
+            status = group["_id"].get("status")
+            if status:
+                counter["status"][status] = (
+                    counter["status"].get(status, 0) + group["n"]
+                )
+
+    written = 0
+    batch = []
+    for counter_id, counter in counters.items():
+        batch.append(UpdateOne({"_id": counter_id}, {"$set": counter}, upsert=True))
+        if len(batch) >= batch_size:
+            mongo.db.task_counters.bulk_write(batch, ordered=False)
+            written += len(batch)
+            batch = []
+    if batch:
+        mongo.db.task_counters.bulk_write(batch, ordered=False)
+        written += len(batch)
+
+    # Counters incremented while the rebuild ran are newer than it; keep them.
+    mongo.db.task_counters.delete_many(
+        {
+            "rebuilt_at": {"$ne": rebuilt_at},
+            "updated_at": {"$not": {"$gte": rebuilt_at}},
+        }
+    )
+    return written
@@ -1,8 +1,66 @@
-import bcrypt
 import datetime
 from flask import jsonify
 from extensions import mongo
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+from models.task import task_cascade_step
+from models.change_version import (
+    bump_versions,
+    owner_projects_scope,
+    assignee_tasks_scope,
+    project_tasks_scope,
+    PROJECTS_SCOPE,
+    USERS_SCOPE,
+)
+from models.task_counter import rename_assignee_counters
+from models.refresh_token import revoke_user_refresh_tokens
+from models.references import link_user_refs
+from utils.cascade import cascade_delete, update_in_batches, DEFAULT_BATCH_SIZE
+from utils.hashing import hash_password
+from utils.indexes import register_indexes
+from utils.jobs import job_handler, submit_job
+from utils.pagination import paginate, COUNT_EXACT
+from utils.search import (
+    search_filter,
+    prefix_filter,
+    normalize_search_key,
+    SEARCH_CONTAINS,
+    SEARCH_PREFIX,
+)
+
+# ``_id`` order follows insertion order and is served by the default index.
+USER_SORT = [("_id", 1)]
+USER_SEARCH_FIELDS = ["full_name", "email"]
+USER_SEARCH_MODES = (SEARCH_CONTAINS, SEARCH_PREFIX)
+# Fields the user list may return; ``password`` and ``search_keys`` never are.
+USER_LIST_FIELDS = ["_id", "full_name", "email", "role", "created_at"]
+# The typeahead reads only these fields, all held in ``TYPEAHEAD_INDEX``, so
+# its queries are answered from the index without fetching any documents.
+TYPEAHEAD_INDEX = [("email", 1), ("full_name", 1)]
+TYPEAHEAD_FIELDS = {"_id": 0, "email": 1, "full_name": 1}
+# Collections and fields rewritten when a user's email changes, in order.
+EMAIL_REFERENCES = (("tasks", "assignee"), ("projects", "owner_email"))
+
+# The role filter leads so the admin directory narrows by role in the index.
+register_indexes(
+    "users",
+    ([("email", 1)], {"unique": True}),
+    [("search_keys", 1)],
+    [("role", 1), ("search_keys", 1)],
+    [("role", 1), ("_id", 1)],
+    TYPEAHEAD_INDEX,
+)
+
+
+def user_search_keys(full_name, email):
+    """
+    Normalized keys used by prefix search: the full name, each word of it and
+    the email, so "smi" finds "Jane Smith" and "jane@" finds her address.
+    """
+    name = normalize_search_key(full_name)
+    keys = {name, normalize_search_key(email), *name.split()}
+    return sorted(key for key in keys if key)
 
 
 def create_user(full_name, email, password, role="user"):
@@ -10,15 +68,19 @@ def create_user(full_name, email, password, role="user"):
     if existing_user:
         return {"success": False, "message": "Email already registered"}
 
-    hashed_pw = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+    hashed_pw = hash_password(password)
     user = {
         "full_name": full_name,
         "email": email,
         "password": hashed_pw,
         "role": role,
+        "search_keys": user_search_keys(full_name, email),
         "created_at": datetime.datetime.utcnow(),
     }
-    mongo.db.users.insert_one(user)
+    user_id = mongo.db.users.insert_one(user).inserted_id
+    bump_versions(USERS_SCOPE)
+    # Tasks and projects may name this email from before the user existed.
+    link_user_refs(email, user_id)
     return {"success": True, "message": "User created successfully"}
 
 
@@ -26,31 +88,152 @@ def find_user_by_email(email):
     return mongo.db.users.find_one({"email": email})
 
 
+def rehash_password(user_id, password):
+    """Store a hash of ``password`` made with the current work factor."""
+    return mongo.db.users.update_one(
+        {"_id": ObjectId(user_id)}, {"$set": {"password": hash_password(password)}}
+    )
+
+
 def get_all_users():
     return list(mongo.db.users.find({}, {"password": 0}))
 
 
-def delete_user_by_id(user_id):
+def get_users_page(
+    search="",
+    role=None,
+    page=1,
+    limit=10,
+    cursor=None,
+    count=COUNT_EXACT,
+    search_mode=SEARCH_CONTAINS,
+    fields=None,
+):
+    query = {}
+    if role:
+        query["role"] = role
+    if search and search_mode == SEARCH_PREFIX:
+        query.update(prefix_filter("search_keys", search))
+    elif search:
+        query.update(search_filter(search, USER_SEARCH_FIELDS, search_mode))
+
+    return paginate(
+        mongo.db.users,
+        query,
+        USER_SORT,
+        limit,
+        page,
+        cursor,
+        count,
+        projection=fields or USER_LIST_FIELDS,
+    )
 
-    user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
-    if not user:
-        return None
 
+def find_user_by_id(user_id):
+    return mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"password": 0})
+
+
+def _user_cascade_steps(user):
+    # The user goes last, so an interrupted cascade can be run again.
     email = user.get("email")
 
-    # Delete user
-    user_delete_result = mongo.db.users.delete_one({"_id": ObjectId(user_id)})
+    def projects_deleted(projects, session):
+        bump_versions(PROJECTS_SCOPE, owner_projects_scope(email), session=session)
+
+    def user_deleted(users, session):
+        bump_versions(USERS_SCOPE, session=session)
+
+    return [
+        task_cascade_step({"assignee": email}),
+        ("projects", mongo.db.projects, {"owner_email": email}, None, projects_deleted),
+        ("users", mongo.db.users, {"_id": user["_id"]}, None, user_deleted),
+    ]
+
+
+def count_user_cascade(user):
+    """Number of tasks and projects that deleting ``user`` would remove."""
+    email = user.get("email")
+    return mongo.db.tasks.count_documents(
+        {"assignee": email}
+    ) + mongo.db.projects.count_documents({"owner_email": email})
+
+
+def delete_user_cascade(user, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Delete ``user`` with their assigned tasks and owned projects.
+
+    Deletes run in bounded batches, each in a transaction where the
+    deployment supports one, and refresh tokens are revoked first so the
+    user cannot sign in again while the cascade runs.
+
+    Args:
+        user (dict): User document, as returned by ``find_user_by_id``
+        batch_size (int): Documents deleted per batch
+        progress (callable, optional): Called with the counts deleted so far
+
+    Returns:
+        dict: Number of tasks, projects and users deleted
+    """
+    revoke_user_refresh_tokens(user["_id"])
+    return cascade_delete(mongo.cx, _user_cascade_steps(user), batch_size, progress)
+
 
-    # Delete all projects where owner/creator email or id is this user
-    mongo.db.projects.delete_many({"owner_email": email})
+def search_user_emails(prefix="", limit=10):
+    """
+    Users whose email starts with ``prefix``, in email order.
 
-    # Delete all tasks assigned to this user
-    mongo.db.tasks.delete_many({"assignee": email})
+    The query is covered by ``TYPEAHEAD_INDEX``: the anchored prefix becomes
+    an index range and only indexed fields are projected. The index is
+    hinted because the planner may otherwise pick the unique ``email``
+    index, which does not hold ``full_name``.
 
-    return user_delete_result
+    Returns:
+        list: Up to ``limit`` ``{"email", "full_name"}`` dicts
+    """
+    query = prefix_filter("email", prefix, normalize=False) if prefix else {}
+    cursor = mongo.db.users.find(query, TYPEAHEAD_FIELDS).sort("email", 1).limit(limit)
+    try:
+        return list(cursor.clone().hint(TYPEAHEAD_INDEX))
+    except OperationFailure:
+        # Indexes are built in the background at startup; until this one
+        # exists the hint is rejected.
+        return list(cursor)
 
 
-def update_user_by_id(user_id, update_fields):
+def delete_user_by_id(user_id):
+    user = find_user_by_id(user_id)
+    if not user:
+        return None
+    return delete_user_cascade(user)
+
+
+@job_handler("delete_user")
+def _delete_user_job(job, report):
+    user = find_user_by_id(job["params"]["user_id"])
+    if not user:
+        return {"tasks": 0, "projects": 0, "users": 0}
+    batch_size = job["params"].get("batch_size", DEFAULT_BATCH_SIZE)
+    return delete_user_cascade(user, batch_size, progress=report)
+
+
+def update_user_by_id(
+    user_id, update_fields, batch_size=DEFAULT_BATCH_SIZE, created_by=None
+):
+    """
+    Update a user. An email change is carried over to their tasks and
+    projects by a background ``rename_email`` job. Changing the email, role
+    or password revokes the user's refresh tokens.
+
+    Args:
+        user_id (str): Id of the user to update
+        update_fields (dict): Fields to set
+        batch_size (int): Documents renamed per batch by the job
+        created_by (str, optional): Email of the admin making the change,
+            recorded on the job so they can poll it
+
+    Returns:
+        tuple: (UpdateResult, job id or None), or None if the user does not exist
+    """
     # Fetch current user email before update
     user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
     if not user:
@@ -59,18 +242,122 @@ def update_user_by_id(user_id, update_fields):
     old_email = user.get("email")
     new_email = update_fields.get("email")
 
+    if update_fields.get("password"):
+        update_fields = {
+            **update_fields,
+            "password": hash_password(update_fields["password"]),
+        }
+
+    if "full_name" in update_fields or "email" in update_fields:
+        update_fields = {
+            **update_fields,
+            "search_keys": user_search_keys(
+                update_fields.get("full_name", user.get("full_name")),
+                update_fields.get("email", old_email),
+            ),
+        }
+
     result = mongo.db.users.update_one(
         {"_id": ObjectId(user_id)}, {"$set": update_fields}
     )
+    if result.modified_count:
+        bump_versions(USERS_SCOPE)
+
+    email_changed = bool(new_email) and new_email != old_email
+    role_changed = "role" in update_fields and update_fields["role"] != user.get("role")
+    # Refresh tokens carry the email and role in their claims, and a new
+    # password must end the sessions opened with the old one.
+    if email_changed or role_changed or update_fields.get("password"):
+        revoke_user_refresh_tokens(user_id)
 
-    # If email changed, update all tasks with old email to new email
-    if new_email and new_email != old_email:
-        mongo.db.tasks.update_many(
-            {"assignee": old_email}, {"$set": {"assignee": new_email}}
+    job_id = None
+    if email_changed:
+        job_id = submit_job(
+            "rename_email",
+            {
+                "user_id": str(user_id),
+                "old_email": old_email,
+                "new_email": new_email,
+                "batch_size": batch_size,
+            },
+            created_by=created_by,
         )
-        # Also update all projects with old ownerEmail to new email
-        mongo.db.projects.update_many(
-            {"owner_email": old_email}, {"$set": {"owner_email": new_email}}
+
+    return result, job_id
+
+
+@job_handler("rename_email")
+def _rename_email_job(job, report):
+    """
+    Rewrite references to ``old_email`` in batches.
+
+    The checkpoint records, per collection, the last ``_id`` processed and
+    whether it is done, so a resumed job skips finished work. Only documents
+    still holding the old email are updated, so rerunning is harmless.
+    """
+    params = job["params"]
+    batch_size = params.get("batch_size", DEFAULT_BATCH_SIZE)
+    checkpoint = job.get("checkpoint") or {}
+    progress = dict(job.get("progress") or {})
+
+    for collection, field in EMAIL_REFERENCES:
+        position = checkpoint.get(collection, {})
+        if position.get("done"):
+            continue
+        base = progress.get(collection, 0)
+
+        def save(updated, last_id, collection=collection, base=base):
+            progress[collection] = base + updated
+            checkpoint[collection] = {"after": last_id, "done": False}
+            report(progress, checkpoint)
+
+        update_in_batches(
+            mongo.db[collection],
+            {field: params["old_email"]},
+            {"$set": {field: params["new_email"]}},
+            batch_size,
+            position.get("after"),
+            save,
         )
+        progress.setdefault(collection, base)
+        checkpoint[collection] = {"done": True}
+        report(progress, checkpoint)
+
+    # Folding an already folded counter is a no-op, so this is rerun safe too,
+    # short of a crash mid-fold on a deployment without transactions.
+    rename_assignee_counters(params["old_email"], params["new_email"])
+    _bump_renamed_scopes(params["old_email"], params["new_email"])
+    return progress
+
+
+def _bump_renamed_scopes(old_email, new_email):
+    project_ids = mongo.db.tasks.distinct("project_id", {"assignee": new_email})
+    bump_versions(
+        PROJECTS_SCOPE,
+        owner_projects_scope(old_email),
+        owner_projects_scope(new_email),
+        assignee_tasks_scope(old_email),
+        assignee_tasks_scope(new_email),
+        *(project_tasks_scope(project_id) for project_id in project_ids),
+    )
+
+
+def backfill_user_search_keys(batch_size=1000):
+    """Store ``search_keys`` on users created before prefix search existed."""
+    cursor = mongo.db.users.find(
+        {"search_keys": {"$exists": False}}, {"full_name": 1, "email": 1}
+    ).batch_size(batch_size)
 
-    return result
+    updated = 0
+    batch = []
+    for user in cursor:
+        keys = user_search_keys(user.get("full_name"), user.get("email"))
+        batch.append(UpdateOne({"_id": user["_id"]}, {"$set": {"search_keys": keys}}))
+        if len(batch) >= batch_size:
+            updated += mongo.db.users.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += mongo.db.users.bulk_write(batch, ordered=False).modified_count
+    if updated:
+        bump_versions(USERS_SCOPE)
+    return updated
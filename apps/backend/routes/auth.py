@@ -1,6 +1,12 @@
 from flask import Blueprint, request, jsonify, current_app
-from models.user import create_user, find_user_by_email
-import jwt, bcrypt, datetime
+from models.user import create_user, find_user_by_email, rehash_password
+from models.refresh_token import (
+    issue_refresh_token,
+    rotate_refresh_token,
+    revoke_refresh_token,
+)
+from utils.hashing import check_password, needs_rehash, HashingPoolSaturated
+import jwt, datetime
 from extensions import mongo
 import re
 
@@ -11,6 +17,23 @@ def is_valid_email(email):
     return re.match(r"[^@]+@[^@]+\.[^@]+", email)
 
 
+def _token_response(claims, refresh_token):
+    access_ttl = datetime.timedelta(minutes=current_app.config["ACCESS_TOKEN_MINUTES"])
+    payload = {**claims, "exp": datetime.datetime.utcnow() + access_ttl}
+    token = jwt.encode(payload, current_app.config["SECRET_KEY"], algorithm="HS256")
+    return jsonify(
+        {
+            "token": token,
+            "refresh_token": refresh_token,
+            "expires_in": int(access_ttl.total_seconds()),
+        }
+    )
+
+
+def _refresh_ttl():
+    return datetime.timedelta(days=current_app.config["REFRESH_TOKEN_DAYS"])
+
+
 @auth_bp.route("/register", methods=["POST"])
 def register():
     data = request.json
@@ -37,14 +60,45 @@ def login():
     data = request.json
 
     user = find_user_by_email(data["email"])
-    if not user or not bcrypt.checkpw(data["password"].encode(), user["password"]):
+    if not user or not check_password(data["password"], user["password"]):
         return jsonify({"error": "Invalid credentials"}), 401
-    payload = {
+
+    # Upgrade hashes made with an older work factor while we know the password.
+    if needs_rehash(user["password"]):
+        try:
+            rehash_password(user["_id"], data["password"])
+        except HashingPoolSaturated:
+            pass
+
+    claims = {
         "id": str(user["_id"]),
         "email": user["email"],
         "full_name": user["full_name"],
         "role": user["role"],
-        "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=2),
     }
-    token = jwt.encode(payload, current_app.config["SECRET_KEY"], algorithm="HS256")
-    return jsonify({"token": token})
+    return _token_response(claims, issue_refresh_token(claims, _refresh_ttl()))
+
+
+@auth_bp.route("/refresh", methods=["POST"])
+def refresh():
+    data = request.json or {}
+    refresh_token = data.get("refresh_token")
+    if not refresh_token:
+        return jsonify({"error": "refresh_token is required"}), 400
+
+    # One indexed lookup replaces the password check; the token is single-use.
+    rotated = rotate_refresh_token(refresh_token, _refresh_ttl())
+    if not rotated:
+        return jsonify({"error": "Invalid refresh token"}), 401
+
+    claims, new_refresh_token = rotated
+    return _token_response(claims, new_refresh_token)
+
+
+@auth_bp.route("/logout", methods=["POST"])
+def logout():
+    data = request.json or {}
+    refresh_token = data.get("refresh_token")
+    if refresh_token:
+        revoke_refresh_token(refresh_token)
+    return jsonify({"message": "Logged out"})
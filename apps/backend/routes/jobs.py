@@ -0,0 +1,38 @@
+from flask import Blueprint, jsonify
+from bson.errors import InvalidId
+from utils.decorators import token_required
+from models.job import get_job_by_id
+
+job_bp = Blueprint("jobs", __name__)
+
+
+@job_bp.route("/<job_id>", methods=["GET"])
+@token_required
+def get_job(job_id, current_user):
+    try:
+        job = get_job_by_id(job_id)
+    except (InvalidId, TypeError):
+        return jsonify({"error": "Invalid job ID"}), 400
+
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    if (
+        job.get("created_by") != current_user["email"]
+        and current_user["role"] != "admin"
+    ):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return jsonify(
+        {
+            "_id": job["_id"],
+            "type": job["type"],
+            "status": job["status"],
+            "progress": job.get("progress", {}),
+            "result": job.get("result"),
+            "error": job.get("error"),
+            "created_at": job["created_at"],
+            "started_at": job.get("started_at"),
+            "finished_at": job.get("finished_at"),
+        }
+    )
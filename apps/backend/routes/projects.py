@@ -1,14 +1,25 @@
-from flask import Blueprint, request, jsonify
-from utils.decorators import token_required
+from flask import Blueprint, request, jsonify, current_app
+from utils.decorators import token_required, require_role, conditional_get
+from models.change_version import owner_projects_scope, PROJECTS_SCOPE
 from models.project import (
     create_project,
     get_projects_by_owner,
     get_all_projects,
     delete_project,
     update_project,
+    export_all_projects,
+    PROJECT_EXPORT_FIELDS,
+    PROJECT_LIST_FIELDS,
 )
-from extensions import mongo
-from bson import ObjectId
+from utils.export import export_response, EXPORT_FORMATS, EXPORT_NDJSON
+from utils.pagination import (
+    InvalidCursor,
+    parse_count,
+    parse_fields,
+    parse_page,
+    DEFAULT_MAX_PAGE_SIZE,
+)
+from utils.search import SEARCH_MODES, SEARCH_CONTAINS
 
 project_bp = Blueprint("projects", __name__)
 
@@ -23,54 +34,95 @@ def new_project(current_user):
     if not name or not description:
         return jsonify({"error": "Name and description are required"}), 400
 
-    create_project(name, description, current_user["email"])
+    create_project(name, description, current_user["email"], current_user.get("id"))
     return jsonify({"message": "Project created"}), 201
 
 
 @project_bp.route("/", methods=["GET"])
 @token_required
+@conditional_get(lambda current_user: [owner_projects_scope(current_user["email"])])
 def get_my_projects(current_user):
-    page = int(request.args.get("page", 1))
-    limit = int(request.args.get("limit", 10))
     search = request.args.get("search", None)
-
-    projects = get_projects_by_owner(current_user["email"], page, limit, search)
-    total_count = mongo.db.projects.count_documents(
-        {"owner_email": current_user["email"]}
-    )
-
-    for p in projects:
-        p["_id"] = str(p["_id"])
-        if "created_at" in p:
-            p["created_at"] = (
-                p["created_at"].isoformat()
-                if hasattr(p["created_at"], "isoformat")
-                else p["created_at"]
-            )
-
-    return jsonify({"projects": projects, "totalCount": total_count})
+    search_mode = request.args.get("search_mode", SEARCH_CONTAINS)
+    cursor = request.args.get("cursor")
+
+    if search_mode not in SEARCH_MODES:
+        return jsonify({"error": f"Invalid search_mode: {search_mode}"}), 400
+
+    try:
+        page, limit = parse_page(
+            request.args,
+            "limit",
+            current_app.config.get("MAX_PAGE_SIZE", DEFAULT_MAX_PAGE_SIZE),
+        )
+        count = parse_count(request.args)
+        fields = parse_fields(request.args, PROJECT_LIST_FIELDS)
+        result = get_projects_by_owner(
+            current_user["email"],
+            page,
+            limit,
+            search,
+            cursor,
+            count,
+            search_mode,
+            owner_id=current_user.get("id"),
+            fields=fields,
+        )
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    return _projects_response(result)
 
 
 @project_bp.route("/all", methods=["GET"])
 @token_required
+@conditional_get(lambda current_user: [PROJECTS_SCOPE])
 def get_all(current_user):
-    page = int(request.args.get("page", 1))
-    limit = int(request.args.get("limit", 10))
     search = request.args.get("search", None)
-
-    projects = get_all_projects(page, limit, search)
-    total_count = mongo.db.projects.count_documents({})
-
-    for p in projects:
-        p["_id"] = str(p["_id"])
-        if "created_at" in p:
-            p["created_at"] = (
-                p["created_at"].isoformat()
-                if hasattr(p["created_at"], "isoformat")
-                else p["created_at"]
-            )
-
-    return jsonify({"projects": projects, "totalCount": total_count})
+    search_mode = request.args.get("search_mode", SEARCH_CONTAINS)
+    cursor = request.args.get("cursor")
+
+    if search_mode not in SEARCH_MODES:
+        return jsonify({"error": f"Invalid search_mode: {search_mode}"}), 400
+
+    try:
+        page, limit = parse_page(
+            request.args,
+            "limit",
+            current_app.config.get("MAX_PAGE_SIZE", DEFAULT_MAX_PAGE_SIZE),
+        )
+        count = parse_count(request.args)
+        fields = parse_fields(request.args, PROJECT_LIST_FIELDS)
+        result = get_all_projects(
+            page, limit, search, cursor, count, search_mode, fields
+        )
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    return _projects_response(result)
+
+
+@project_bp.route("/all/export", methods=["GET"])
+@token_required
+@require_role("admin")
+def export_all(current_user):
+    fmt = request.args.get("format", EXPORT_NDJSON)
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Invalid format: {fmt}"}), 400
+
+    cursor = export_all_projects(current_app.config["EXPORT_BATCH_SIZE"])
+    return export_response(cursor, PROJECT_EXPORT_FIELDS, fmt, "projects")
+
+
+def _projects_response(result):
+    return jsonify(
+        {
+            "projects": result.items,
+            "totalCount": result.total,
+            "total_capped": result.total_capped,
+            "next_cursor": result.next_cursor,
+        }
+    )
 
 
 @project_bp.route("/delete", methods=["DELETE"])
@@ -1,40 +1,185 @@
 from flask import Blueprint, request, jsonify, current_app
-from utils.decorators import token_required
+from utils.decorators import token_required, conditional_get
+from models.change_version import (
+    project_tasks_scope,
+    assignee_tasks_scope,
+    PROJECTS_SCOPE,
+)
 from models.task import (
     create_task,
+    create_tasks,
     get_tasks_by_project,
     update_task_status,
     delete_task,
     get_user_tasks,
     update_task,
+    bulk_update_tasks,
+    update_tasks_matching,
+    get_project_task_stats,
+    get_user_task_stats,
+    export_project_tasks,
+    export_user_tasks,
+    TASK_EXPORT_FIELDS,
+    TASK_LIST_FIELDS,
+    USER_TASK_LIST_FIELDS,
+    TASK_SORTS,
+    DEFAULT_TASK_SORT,
+)
+from utils.export import export_response, EXPORT_FORMATS, EXPORT_NDJSON
+from utils.pagination import (
+    InvalidCursor,
+    parse_count,
+    parse_fields,
+    parse_page,
+    DEFAULT_MAX_PAGE_SIZE,
 )
-from extensions import mongo
+from utils.search import SEARCH_MODES, SEARCH_CONTAINS
 
 task_bp = Blueprint("tasks", __name__)
 
+DEFAULT_BULK_MAX_TASKS = 500
+REQUIRED_TASK_FIELDS = ("title", "description", "project_id", "assignee")
+
+
+def _priority_error(fields):
+    priority = fields.get("priority")
+    # bool is an int subclass, but true/false is not a priority.
+    if priority is not None and (
+        not isinstance(priority, int) or isinstance(priority, bool)
+    ):
+        return "priority must be an integer"
+    return None
+
+
+def _task_error(item):
+    if not isinstance(item, dict):
+        return "Task must be an object"
+    missing = [field for field in REQUIRED_TASK_FIELDS if not item.get(field)]
+    if missing:
+        return f"Missing fields: {', '.join(missing)}"
+    return _priority_error(item)
+
 
 @task_bp.route("/", methods=["POST"])
 @token_required
 def new_task(current_user):
     data = request.json
 
+    error = _priority_error(data)
+    if error:
+        return jsonify({"error": error}), 400
+
     create_task(
-        data["title"], data["description"], data["project_id"], data["assignee"]
+        data["title"],
+        data["description"],
+        data["project_id"],
+        data["assignee"],
+        data.get("priority"),
     )
     return jsonify({"message": "Task created"}), 201
 
 
+@task_bp.route("/bulk", methods=["POST"])
+@token_required
+def new_tasks(current_user):
+    data = request.json or {}
+    items = data.get("tasks")
+    ordered = bool(data.get("ordered", True))
+    max_tasks = current_app.config.get("BULK_MAX_TASKS", DEFAULT_BULK_MAX_TASKS)
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "tasks must be a non-empty list"}), 400
+    if len(items) > max_tasks:
+        return jsonify({"error": f"At most {max_tasks} tasks per request"}), 400
+
+    # Invalid items are reported and never sent; in ordered mode nothing
+    # after the first invalid item is attempted either.
+    results = [{"index": index, "status": "skipped"} for index in range(len(items))]
+    valid = []
+    for index, item in enumerate(items):
+        error = _task_error(item)
+        if error:
+            results[index] = {"index": index, "status": "invalid", "error": error}
+            if ordered:
+                break
+        else:
+            valid.append(index)
+
+    outcomes = create_tasks([items[index] for index in valid], ordered) if valid else []
+    for index, outcome in zip(valid, outcomes):
+        if outcome is None:
+            continue
+        if "error" in outcome:
+            results[index] = {"index": index, "status": "failed", **outcome}
+        else:
+            results[index] = {"index": index, "status": "created", **outcome}
+
+    created = sum(result["status"] == "created" for result in results)
+    return (
+        jsonify({"created": created, "results": results}),
+        201 if created == len(items) else 207,
+    )
+
+
 @task_bp.route("/project/<project_id>", methods=["GET"])
 @token_required
+@conditional_get(lambda current_user, project_id: [project_tasks_scope(project_id)])
 def get_tasks(current_user, project_id):
     search = request.args.get("search", "").strip()
     status = request.args.get("status", "").strip().lower()
-    page = int(request.args.get("page", 1))
-    per_page = int(request.args.get("per_page", 10))
+    cursor = request.args.get("cursor")
+    sort = request.args.get("sort", DEFAULT_TASK_SORT)
+    search_mode = request.args.get("search_mode", SEARCH_CONTAINS)
+
+    if sort not in TASK_SORTS:
+        return jsonify({"error": f"Invalid sort: {sort}"}), 400
+    if search_mode not in SEARCH_MODES:
+        return jsonify({"error": f"Invalid search_mode: {search_mode}"}), 400
 
-    tasks, total = get_tasks_by_project(project_id, search, status, page, per_page)
+    try:
+        page, per_page = parse_page(
+            request.args,
+            "per_page",
+            current_app.config.get("MAX_PAGE_SIZE", DEFAULT_MAX_PAGE_SIZE),
+        )
+        count = parse_count(request.args)
+        fields = parse_fields(request.args, TASK_LIST_FIELDS)
+        result = get_tasks_by_project(
+            project_id,
+            search,
+            status,
+            page,
+            per_page,
+            cursor,
+            sort,
+            count,
+            search_mode,
+            fields,
+        )
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(
+        {
+            "tasks": result.items,
+            "total": result.total,
+            "total_capped": result.total_capped,
+            "page": page,
+            "per_page": per_page,
+            "next_cursor": result.next_cursor,
+        }
+    )
+
+
+@task_bp.route("/project/<project_id>/export", methods=["GET"])
+@token_required
+def export_tasks(current_user, project_id):
+    fmt = request.args.get("format", EXPORT_NDJSON)
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Invalid format: {fmt}"}), 400
 
-    return jsonify({"tasks": tasks, "total": total, "page": page, "per_page": per_page})
+    cursor = export_project_tasks(project_id, current_app.config["EXPORT_BATCH_SIZE"])
+    return export_response(cursor, TASK_EXPORT_FIELDS, fmt, f"tasks-{project_id}")
 
 
 @task_bp.route("/update-status", methods=["PUT"])
@@ -42,8 +187,8 @@ def get_tasks(current_user, project_id):
 def update_status(current_user):
     data = request.json
 
-    result = update_task_status(data["task_id"], data["status"])
-    return jsonify({"updated": result.modified_count})
+    updated = update_task_status(data["task_id"], data["status"])
+    return jsonify({"updated": updated})
 
 
 @task_bp.route("/delete", methods=["DELETE"])
@@ -51,21 +196,77 @@ def update_status(current_user):
 def delete(current_user):
     task_id = request.json.get("task_id")
 
-    result = delete_task(task_id)
-    return jsonify({"deleted": result.deleted_count})
+    deleted = delete_task(task_id)
+    return jsonify({"deleted": deleted})
 
 
 @task_bp.route("/user-tasks", methods=["GET"])
 @token_required
+# Project names and owners are joined in, so project writes count too.
+@conditional_get(
+    lambda current_user: [assignee_tasks_scope(current_user["email"]), PROJECTS_SCOPE]
+)
 def get_user_tasks_route(current_user):
     search = request.args.get("search", "").strip()
     status = request.args.get("status", "").strip().lower()
-    page = int(request.args.get("page", 1))
-    per_page = int(request.args.get("per_page", 10))
+    cursor = request.args.get("cursor")
+    sort = request.args.get("sort", DEFAULT_TASK_SORT)
+    search_mode = request.args.get("search_mode", SEARCH_CONTAINS)
+
+    if sort not in TASK_SORTS:
+        return jsonify({"error": f"Invalid sort: {sort}"}), 400
+    if search_mode not in SEARCH_MODES:
+        return jsonify({"error": f"Invalid search_mode: {search_mode}"}), 400
+
+    try:
+        page, per_page = parse_page(
+            request.args,
+            "per_page",
+            current_app.config.get("MAX_PAGE_SIZE", DEFAULT_MAX_PAGE_SIZE),
+        )
+        count = parse_count(request.args)
+        fields = parse_fields(request.args, USER_TASK_LIST_FIELDS)
+        result = get_user_tasks(
+            current_user["email"],
+            search,
+            status,
+            page,
+            per_page,
+            cursor,
+            sort,
+            count,
+            search_mode,
+            user_id=current_user.get("id"),
+            fields=fields,
+        )
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
 
-    tasks, total = get_user_tasks(current_user["email"], search, status, page, per_page)
+    return jsonify(
+        {
+            "tasks": result.items,
+            "total": result.total,
+            "total_capped": result.total_capped,
+            "page": page,
+            "per_page": per_page,
+            "next_cursor": result.next_cursor,
+        }
+    )
 
-    return jsonify({"tasks": tasks, "total": total, "page": page, "per_page": per_page})
+
+@task_bp.route("/user-tasks/export", methods=["GET"])
+@token_required
+def export_user_tasks_route(current_user):
+    fmt = request.args.get("format", EXPORT_NDJSON)
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Invalid format: {fmt}"}), 400
+
+    cursor = export_user_tasks(
+        current_user["email"],
+        current_user.get("id"),
+        current_app.config["EXPORT_BATCH_SIZE"],
+    )
+    return export_response(cursor, TASK_EXPORT_FIELDS, fmt, "my-tasks")
 
 
 @task_bp.route("/update", methods=["PUT"])
@@ -77,10 +278,74 @@ def update(current_user):
 
     if not task_id or not updates:
         return jsonify({"error": "Missing task_id or updates"}), 400
+    error = _priority_error(updates)
+    if error:
+        return jsonify({"error": error}), 400
 
-    result = update_task(task_id, updates)
+    updated = update_task(task_id, updates)
 
-    if result is None:
+    if updated is None:
         return jsonify({"error": "No valid fields to update"}), 400
 
-    return jsonify({"updated": result.modified_count})
+    return jsonify({"updated": updated})
+
+
+@task_bp.route("/bulk-update", methods=["PUT"])
+@token_required
+def bulk_update(current_user):
+    data = request.json or {}
+    operations = data.get("operations")
+    match = data.get("filter")
+    max_tasks = current_app.config.get("BULK_MAX_TASKS", DEFAULT_BULK_MAX_TASKS)
+
+    if (operations is None) == (match is None):
+        return jsonify({"error": "Send either operations or a filter"}), 400
+
+    if match is not None:
+        if not isinstance(match, dict) or not isinstance(data.get("updates"), dict):
+            return jsonify({"error": "filter and updates must be objects"}), 400
+        error = _priority_error(data["updates"])
+        if error:
+            return jsonify({"error": error}), 400
+        try:
+            result = update_tasks_matching(match, data["updates"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if result is None:
+            return jsonify({"error": "No valid fields to update"}), 400
+        return jsonify({**result, "results": [{"index": 0, **result}]})
+
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations must be a non-empty list"}), 400
+    if len(operations) > max_tasks:
+        return jsonify({"error": f"At most {max_tasks} operations per request"}), 400
+    if not all(isinstance(operation, dict) for operation in operations):
+        return jsonify({"error": "Each operation must be an object"}), 400
+    for index, operation in enumerate(operations):
+        updates = operation.get("updates")
+        error = _priority_error(updates) if isinstance(updates, dict) else None
+        if error:
+            return jsonify({"error": f"operations[{index}]: {error}"}), 400
+
+    results, result = bulk_update_tasks(operations)
+    return jsonify(
+        {
+            "matched": result.matched_count if result else 0,
+            "modified": result.modified_count if result else 0,
+            "results": [
+                {"index": index, **outcome} for index, outcome in enumerate(results)
+            ],
+        }
+    )
+
+
+@task_bp.route("/stats/project/<project_id>", methods=["GET"])
+@token_required
+def project_stats(current_user, project_id):
+    return jsonify(get_project_task_stats(project_id))
+
+
+@task_bp.route("/stats/user", methods=["GET"])
+@token_required
+def user_stats(current_user):
+    return jsonify(get_user_task_stats(current_user["email"]))
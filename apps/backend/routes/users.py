@@ -1,12 +1,35 @@
-from flask import Blueprint, jsonify, request
-from utils.decorators import token_required, require_role
-from models.user import get_all_users, delete_user_by_id, update_user_by_id
+from flask import Blueprint, jsonify, request, current_app
+from utils.decorators import token_required, require_role, conditional_get
+from models.change_version import USERS_SCOPE
+from models.user import (
+    get_users_page,
+    search_user_emails,
+    USER_SEARCH_MODES,
+    USER_LIST_FIELDS,
+    find_user_by_id,
+    count_user_cascade,
+    delete_user_cascade,
+    update_user_by_id,
+)
 from extensions import mongo
 from bson import ObjectId
 from bson.errors import InvalidId
+from utils.pagination import (
+    InvalidCursor,
+    parse_count,
+    parse_fields,
+    parse_page,
+    DEFAULT_MAX_PAGE_SIZE,
+)
+from utils.cascade import DEFAULT_BATCH_SIZE
+from utils.jobs import submit_job
+from utils.search import SEARCH_CONTAINS
 
 user_bp = Blueprint("users", __name__)
 
+MAX_TYPEAHEAD_LIMIT = 50
+TYPEAHEAD_MAX_AGE = 30
+
 
 def is_valid_objectid(id_str):
     try:
@@ -19,30 +42,40 @@ def is_valid_objectid(id_str):
 @user_bp.route("/", methods=["GET"])
 @token_required
 @require_role("admin")
+@conditional_get(lambda current_user: [USERS_SCOPE])
 def get_users(current_user):
-    page = int(request.args.get("page", 1))
-    limit = int(request.args.get("limit", 10))
     search = request.args.get("search", "")
+    search_mode = request.args.get("search_mode", SEARCH_CONTAINS)
     role_filter = request.args.get("role")
+    cursor = request.args.get("cursor")
 
-    query = {}
-    if search:
-        query["$or"] = [
-            {"full_name": {"$regex": search, "$options": "i"}},
-            {"email": {"$regex": search, "$options": "i"}},
-        ]
-    if role_filter:
-        query["role"] = role_filter
-
-    skip = (page - 1) * limit
-    users_cursor = mongo.db.users.find(query).skip(skip).limit(limit)
-    users = list(users_cursor)
-    total = mongo.db.users.count_documents(query)
-
-    for user in users:
-        user["_id"] = str(user["_id"])
+    if search_mode not in USER_SEARCH_MODES:
+        return jsonify({"error": f"Invalid search_mode: {search_mode}"}), 400
 
-    return jsonify({"users": users, "total": total, "page": page, "limit": limit})
+    try:
+        page, limit = parse_page(
+            request.args,
+            "limit",
+            current_app.config.get("MAX_PAGE_SIZE", DEFAULT_MAX_PAGE_SIZE),
+        )
+        count = parse_count(request.args)
+        fields = parse_fields(request.args, USER_LIST_FIELDS)
+        result = get_users_page(
+            search, role_filter, page, limit, cursor, count, search_mode, fields
+        )
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(
+        {
+            "users": result.items,
+            "total": result.total,
+            "total_capped": result.total_capped,
+            "page": page,
+            "limit": limit,
+            "next_cursor": result.next_cursor,
+        }
+    )
 
 
 @user_bp.route("/delete", methods=["DELETE"])
@@ -50,34 +83,49 @@ def get_users(current_user):
 @require_role("admin")
 def delete_user(current_user):
     data = request.json
-    print(data)
     user_id = data.get("id")
 
     if not user_id or not is_valid_objectid(user_id):
         return jsonify({"error": "Invalid User ID"}), 400
 
-    user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
-    if not user_id:
-        return jsonify({"error": "User ID is required"}), 400
-
-    # Fetch user to check email before deletion
-    user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
+    user = find_user_by_id(user_id)
     if not user:
         return jsonify({"error": "User not found"}), 404
 
     if user.get("email") == current_user["email"]:
         return jsonify({"error": "Admins cannot delete their own account"}), 403
 
-    result = delete_user_by_id(user_id)
-
-    if not result or result.deleted_count == 0:
+    batch_size = current_app.config.get("CASCADE_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+
+    # Large cascades run as a background job the client can poll.
+    threshold = current_app.config.get("CASCADE_BACKGROUND_THRESHOLD", 1000)
+    if count_user_cascade(user) > threshold:
+        job_id = submit_job(
+            "delete_user",
+            {"user_id": user_id, "batch_size": batch_size},
+            created_by=current_user["email"],
+        )
+        return (
+            jsonify(
+                {
+                    "message": f"Deletion of user with id {user_id} started",
+                    "job_id": job_id,
+                }
+            ),
+            202,
+        )
+
+    deleted = delete_user_cascade(user, batch_size)
+
+    if deleted["users"] == 0:
         return jsonify({"error": "User not found or could not be deleted"}), 404
 
     return (
         jsonify(
             {
                 "message": f"User with id {user_id} deleted",
-                "deleted": result.deleted_count,
+                "deleted": deleted["users"],
+                "cascade": deleted,
             }
         ),
         200,
@@ -102,20 +150,43 @@ def update_user(current_user):
     if not update_fields:
         return jsonify({"error": "No valid fields to update"}), 400
 
-    result = update_user_by_id(user_id, update_fields)
+    batch_size = current_app.config.get("CASCADE_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+    updated = update_user_by_id(
+        user_id, update_fields, batch_size, created_by=current_user["email"]
+    )
 
-    if result.modified_count == 0:
+    if not updated or updated[0].modified_count == 0:
         return jsonify({"message": "No changes made or user not found"}), 404
 
-    return (
-        jsonify(
-            {
-                "message": f"User with id {user_id} updated",
-                "modified": result.modified_count,
-            }
-        ),
-        200,
-    )
+    result, job_id = updated
+    response = {
+        "message": f"User with id {user_id} updated",
+        "modified": result.modified_count,
+    }
+    if job_id:
+        # Tasks and projects follow the new email in the background.
+        response["job_id"] = job_id
+        return jsonify(response), 202
+
+    return jsonify(response), 200
+
+
+@user_bp.route("/typeahead", methods=["GET"])
+@token_required
+def typeahead(current_user):
+    prefix = request.args.get("q", "").strip()
+    try:
+        limit = int(request.args.get("limit", 10))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    limit = max(1, min(limit, MAX_TYPEAHEAD_LIMIT))
+
+    response = jsonify({"users": search_user_emails(prefix, limit)})
+    # Pickers repeat the same prefixes; let clients revalidate cheaply.
+    response.add_etag()
+    response.cache_control.private = True
+    response.cache_control.max_age = TYPEAHEAD_MAX_AGE
+    return response.make_conditional(request)
 
 
 @user_bp.route("/emails", methods=["GET"])
@@ -1,5 +1,12 @@
+import datetime
+import json
 import pytest
-from app import app
+from bson import ObjectId
+from app import create_app
+from wsgi import app
+from extensions import mongo
+from utils.database import mongo_client_options
+from utils.indexes import ensure_indexes, index_drift
 
 
 class TestApp:
@@ -27,3 +34,106 @@ class TestApp:
         """Test 404 error handling."""
         response = test_client.get("/api/nonexistent")
         assert response.status_code == 404
+
+    def test_indexes_match_registry(self, test_client, test_db):
+        """Test that ensuring indexes leaves no declared index missing."""
+        ensure_indexes(test_db)
+
+        report = index_drift(test_db)
+
+        assert set(report) >= {"users", "projects", "tasks"}
+        assert all(not drift["missing"] for drift in report.values())
+
+    def test_json_provider_encodes_documents(self, test_client):
+        """Test that ObjectIds, datetimes and bytes serialize without conversion."""
+        oid = ObjectId()
+        created_at = datetime.datetime(2024, 1, 2, 3, 4, 5)
+
+        with app.app_context():
+            data = app.json.loads(
+                app.json.dumps({"_id": oid, "created_at": created_at, "raw": b"hi"})
+            )
+
+        assert data == {
+            "_id": str(oid),
+            "created_at": "2024-01-02T03:04:05",
+            "raw": "aGk=",
+        }
+
+    def test_mongo_client_options_from_config(self, test_client):
+        """Test that pool settings come from config and health reports the pool."""
+        options = mongo_client_options(
+            {
+                "MONGO_MAX_POOL_SIZE": 5,
+                "MONGO_WAIT_QUEUE_TIMEOUT_MS": 250,
+                "MONGO_SOCKET_TIMEOUT_MS": 0,
+                "MONGO_COMPRESSORS": "zstd,zlib",
+            }
+        )
+
+        assert options["maxPoolSize"] == 5
+        assert options["waitQueueTimeoutMS"] == 250
+        assert options["socketTimeoutMS"] is None
+        assert options["compressors"] == "zstd,zlib"
+
+        data = test_client.get("/api/health").get_json()
+        assert data["mongo_pool"]["maxPoolSize"] == app.config["MONGO_MAX_POOL_SIZE"]
+
+    def test_create_app_applies_config_overrides(self, test_client):
+        """Test that the app factory builds independent, configured apps."""
+        client = mongo.cx
+        other = create_app({"ENSURE_INDEXES": False, "BULK_MAX_TASKS": 5})
+
+        assert other is not app
+        assert other.config["BULK_MAX_TASKS"] == 5
+        assert other.test_client().get("/api/health").status_code == 200
+        # Apps in one process share the client instead of replacing it.
+        assert mongo.cx is client
+        with pytest.raises(ValueError):
+            create_app({"ENSURE_INDEXES": False, "MONGO_URI": "mongodb://other/db"})
+
+    def test_metrics_endpoint(self, test_client):
+        """Test that request metrics are exposed in the Prometheus format."""
+        test_client.get("/api/health")
+
+        response = test_client.get("/api/metrics")
+        assert response.status_code == 200
+        assert response.mimetype == "text/plain"
+
+        body = response.get_data(as_text=True)
+        assert "# TYPE http_request_duration_seconds histogram" in body
+        assert (
+            'http_request_duration_seconds_count{method="GET",'
+            'route="/api/health",status="200"}'
+        ) in body
+        assert "# TYPE mongodb_command_duration_seconds histogram" in body
+
+    def test_metrics_require_token_outside_testing(self, test_client):
+        """Test that metrics are not served without a token in production."""
+        test_client.application.testing = False
+        try:
+            response = test_client.get("/api/metrics")
+        finally:
+            test_client.application.testing = True
+        assert response.status_code == 403
+
+    def test_metrics_merge_worker_files(self, test_client, tmp_path, monkeypatch):
+        """Test that a scrape adds up the metrics of every worker."""
+        from utils import metrics
+
+        monkeypatch.setattr(metrics, "_directory", str(tmp_path))
+        monkeypatch.setattr(metrics, "_worker_pid", None)
+        series = [[["GET", "/api/health", 200], [[1] + [0] * 13, 0.001]]]
+        for pid in (101, 102):
+            (tmp_path / f"worker-{pid}-1.json").write_text(
+                json.dumps({"metrics": {"http_request_duration_seconds": series}})
+            )
+        metrics.mark_process_dead(102)
+
+        body = test_client.get("/api/metrics").get_data(as_text=True)
+        assert (
+            'http_request_duration_seconds_count{method="GET",'
+            'route="/api/health",status="200"} '
+        ) in body
+        assert not (tmp_path / "worker-102-1.json").exists()
+        assert (tmp_path / "dead.json").exists()
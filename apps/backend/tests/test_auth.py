@@ -1,6 +1,7 @@
 import pytest
 import json
 from unittest.mock import patch, MagicMock
+from utils.decorators import token_cache
 
 
 @pytest.mark.auth
@@ -174,3 +175,92 @@ class TestAuth:
         assert response.status_code == 400
         data = response.get_json()
         assert "error" in data or "message" in data
+
+    def test_token_cache_reuses_verified_claims(self, test_client, auth_token):
+        """Test that repeated requests hit the verified-token cache."""
+        token_cache.clear()
+        headers = {"Authorization": auth_token}
+
+        test_client.get("/api/tasks/stats/user", headers=headers)
+        test_client.get("/api/tasks/stats/user", headers=headers)
+
+        stats = token_cache.stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+
+    def test_token_cache_respects_secret_rotation(self, test_client, auth_token):
+        """Test that a cached token is rejected once SECRET_KEY changes."""
+        headers = {"Authorization": auth_token}
+        assert (
+            test_client.get("/api/tasks/stats/user", headers=headers).status_code == 200
+        )
+
+        original_secret = test_client.application.config["SECRET_KEY"]
+        test_client.application.config["SECRET_KEY"] = "rotated-secret-key"
+        try:
+            response = test_client.get("/api/tasks/stats/user", headers=headers)
+            assert response.status_code == 401
+        finally:
+            test_client.application.config["SECRET_KEY"] = original_secret
+
+    def test_login_rehashes_on_work_factor_change(
+        self, test_client, test_db, sample_user
+    ):
+        """Test that logging in upgrades a hash made with an old work factor."""
+        config = test_client.application.config
+        original_rounds = config["BCRYPT_ROUNDS"]
+        try:
+            config["BCRYPT_ROUNDS"] = 4
+            test_client.post(
+                "/api/auth/register",
+                data=json.dumps(sample_user),
+                content_type="application/json",
+            )
+            config["BCRYPT_ROUNDS"] = 5
+            response = test_client.post(
+                "/api/auth/login",
+                data=json.dumps(
+                    {"email": sample_user["email"], "password": sample_user["password"]}
+                ),
+                content_type="application/json",
+            )
+        finally:
+            config["BCRYPT_ROUNDS"] = original_rounds
+
+        assert response.status_code == 200
+        user = test_db.users.find_one({"email": sample_user["email"]})
+        assert user["password"].startswith(b"$2b$05$")
+
+    def test_refresh_token_rotation(self, test_client, test_db, sample_user):
+        """Test that a refresh token yields new tokens and cannot be reused."""
+        if test_db is None:
+            pytest.skip("Database not available")
+
+        test_client.post(
+            "/api/auth/register",
+            data=json.dumps(sample_user),
+            content_type="application/json",
+        )
+        login = test_client.post(
+            "/api/auth/login",
+            data=json.dumps(
+                {"email": sample_user["email"], "password": sample_user["password"]}
+            ),
+            content_type="application/json",
+        ).get_json()
+        assert "refresh_token" in login
+
+        refreshed = test_client.post(
+            "/api/auth/refresh",
+            data=json.dumps({"refresh_token": login["refresh_token"]}),
+            content_type="application/json",
+        )
+        assert refreshed.status_code == 200
+        assert refreshed.get_json()["refresh_token"] != login["refresh_token"]
+
+        reused = test_client.post(
+            "/api/auth/refresh",
+            data=json.dumps({"refresh_token": login["refresh_token"]}),
+            content_type="application/json",
+        )
+        assert reused.status_code == 401
@@ -1,6 +1,8 @@
 import pytest
 import json
 from bson import ObjectId
+from datetime import datetime
+from utils.response_cache import get_response_cache
 
 
 @pytest.mark.api
@@ -112,3 +114,102 @@ class TestProjects:
 
         project = test_db.projects.find_one({"_id": project_id})
         assert project is None
+
+    def test_get_projects_with_cursor(self, test_client, test_db, auth_token):
+        """Test walking all projects with cursor pagination."""
+        if test_db is None:
+            pytest.skip("Database not available")
+
+        test_db.projects.insert_many(
+            [
+                {
+                    "name": f"Project {i}",
+                    "description": "Paged",
+                    "owner_email": "test@example.com",
+                    "created_at": datetime.utcnow(),
+                }
+                for i in range(5)
+            ]
+        )
+
+        headers = {"Authorization": auth_token}
+        seen = []
+        cursor = ""
+        while cursor is not None:
+            response = test_client.get(
+                f"/api/projects/?limit=2&cursor={cursor}", headers=headers
+            )
+            assert response.status_code == 200
+            data = response.get_json()
+            seen.extend(p["_id"] for p in data["projects"])
+            cursor = data["next_cursor"]
+
+        assert len(seen) == 5
+        assert len(set(seen)) == 5
+
+    def test_get_projects_invalid_cursor(self, test_client, test_db, auth_token):
+        """Test that a malformed cursor is rejected."""
+        headers = {"Authorization": auth_token}
+        response = test_client.get(
+            "/api/projects/?cursor=not-a-cursor", headers=headers
+        )
+
+        assert response.status_code == 400
+
+    def test_get_projects_total_respects_search(self, test_client, test_db, auth_token):
+        """Test that totalCount counts only the projects matching the search."""
+        test_db.projects.insert_many(
+            [
+                {
+                    "name": name,
+                    "description": "Counted",
+                    "owner_email": "test@example.com",
+                    "created_at": datetime.utcnow(),
+                }
+                for name in ["Alpha", "Alpha Two", "Beta"]
+            ]
+        )
+
+        headers = {"Authorization": auth_token}
+        response = test_client.get("/api/projects/?search=Alpha", headers=headers)
+        assert response.status_code == 200
+        assert response.get_json()["totalCount"] == 2
+
+        response = test_client.get("/api/projects/all?count=1", headers=headers)
+        data = response.get_json()
+        assert data["totalCount"] == 1
+        assert data["total_capped"] is True
+
+    def test_all_projects_cached_until_write(
+        self, test_client, test_db, auth_token, admin_token
+    ):
+        """Test that viewers share a cached list that a write invalidates."""
+        cache = get_response_cache()
+        cache.clear()
+        test_client.post(
+            "/api/projects/",
+            data=json.dumps({"name": "Cached", "description": "Shared list"}),
+            content_type="application/json",
+            headers={"Authorization": auth_token},
+        )
+
+        first = test_client.get(
+            "/api/projects/all?page=1&limit=5", headers={"Authorization": auth_token}
+        )
+        second = test_client.get(
+            "/api/projects/all?limit=5&page=1", headers={"Authorization": admin_token}
+        )
+        assert first.get_json() == second.get_json()
+        assert cache.stats()["hits"] == 1
+
+        project_id = test_db.projects.find_one({"name": "Cached"})["_id"]
+        test_client.put(
+            "/api/projects/update",
+            data=json.dumps({"project_id": str(project_id), "name": "Renamed"}),
+            content_type="application/json",
+            headers={"Authorization": auth_token},
+        )
+        third = test_client.get(
+            "/api/projects/all?page=1&limit=5", headers={"Authorization": admin_token}
+        )
+        assert third.get_json()["projects"][0]["name"] == "Renamed"
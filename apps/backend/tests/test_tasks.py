@@ -1,5 +1,7 @@
 import pytest
 import json
+from bson import ObjectId
+from datetime import datetime
 
 
 @pytest.mark.api
@@ -18,6 +20,30 @@ class TestTasks:
 
         assert response.status_code == 201
 
+    def test_create_task_invalid_priority(
+        self, test_client, test_db, auth_token, sample_task
+    ):
+        """Test that non-integer priorities are rejected on create and update."""
+        headers = {"Authorization": auth_token}
+        for priority in ("high", True, 1.5):
+            response = test_client.post(
+                "/api/tasks/",
+                data=json.dumps({**sample_task, "priority": priority}),
+                content_type="application/json",
+                headers=headers,
+            )
+            assert response.status_code == 400
+
+        response = test_client.put(
+            "/api/tasks/update",
+            data=json.dumps(
+                {"task_id": str(ObjectId()), "updates": {"priority": "high"}}
+            ),
+            content_type="application/json",
+            headers=headers,
+        )
+        assert response.status_code == 400
+
     def test_get_user_tasks(self, test_client, test_db, auth_token):
         """Test getting user's tasks."""
         project = {
@@ -115,3 +141,384 @@ class TestTasks:
         assert response.status_code == 200
         deleted_task = test_db.tasks.find_one({"_id": task_id})
         assert deleted_task is None
+
+    def test_get_project_tasks_with_cursor(self, test_client, test_db, auth_token):
+        """Test cursor pagination over a project's tasks never repeats a task."""
+        project_id = str(ObjectId())
+        test_db.tasks.insert_many(
+            [
+                {
+                    "title": f"Task {i}",
+                    "description": "Paged",
+                    "project_id": project_id,
+                    "assignee": "test@example.com",
+                    "status": "open" if i % 2 else "completed",
+                    "created_at": datetime.utcnow(),
+                }
+                for i in range(5)
+            ]
+        )
+
+        headers = {"Authorization": auth_token}
+        seen = []
+        cursor = ""
+        while cursor is not None:
+            response = test_client.get(
+                f"/api/tasks/project/{project_id}?per_page=2&sort=status&cursor={cursor}",
+                headers=headers,
+            )
+            assert response.status_code == 200
+            data = response.get_json()
+            seen.extend(t["_id"] for t in data["tasks"])
+            cursor = data["next_cursor"]
+
+        assert len(seen) == 5
+        assert len(set(seen)) == 5
+
+    def test_get_user_tasks_invalid_sort(self, test_client, test_db, auth_token):
+        """Test that an unknown sort key is rejected."""
+        headers = {"Authorization": auth_token}
+        response = test_client.get("/api/tasks/user-tasks?sort=title", headers=headers)
+
+        assert response.status_code == 400
+
+    def test_get_user_tasks_invalid_page_size(self, test_client, test_db, auth_token):
+        """Test that page sizes outside 1..MAX_PAGE_SIZE are rejected."""
+        headers = {"Authorization": auth_token}
+        for query in ("per_page=0", "per_page=-1", "per_page=1000", "page=abc"):
+            response = test_client.get(
+                f"/api/tasks/user-tasks?{query}", headers=headers
+            )
+
+            assert response.status_code == 400
+
+    def test_get_project_tasks_text_search(self, test_client, test_db, auth_token):
+        """Test relevance-ranked text search combined with the status filter."""
+        test_db.tasks.create_index(
+            [("title", "text"), ("description", "text")],
+            weights={"title": 5, "description": 1},
+            name="tasks_text",
+        )
+        project_id = str(ObjectId())
+        test_db.tasks.insert_many(
+            [
+                {
+                    "title": "Deploy release",
+                    "description": "Ship it",
+                    "project_id": project_id,
+                    "assignee": "test@example.com",
+                    "status": "open",
+                },
+                {
+                    "title": "Write notes",
+                    "description": "Notes for the release",
+                    "project_id": project_id,
+                    "assignee": "test@example.com",
+                    "status": "open",
+                },
+                {
+                    "title": "Release retro",
+                    "description": "Done",
+                    "project_id": project_id,
+                    "assignee": "test@example.com",
+                    "status": "completed",
+                },
+            ]
+        )
+
+        headers = {"Authorization": auth_token}
+        response = test_client.get(
+            f"/api/tasks/project/{project_id}?search=release&search_mode=text&status=open",
+            headers=headers,
+        )
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["total"] == 2
+        assert data["tasks"][0]["title"] == "Deploy release"
+
+    def test_task_stats_follow_writes(self, test_client, test_db, auth_token):
+        """Test that per-project and per-user counters track task writes."""
+        test_db.task_counters.delete_many({})
+        project_id = str(ObjectId())
+        headers = {"Authorization": auth_token}
+        for title in ["First", "Second"]:
+            test_client.post(
+                "/api/tasks/",
+                data=json.dumps(
+                    {
+                        "title": title,
+                        "description": "Counted",
+                        "project_id": project_id,
+                        "assignee": "test@example.com",
+                    }
+                ),
+                content_type="application/json",
+                headers=headers,
+            )
+        task = test_db.tasks.find_one({"title": "First"})
+        test_client.put(
+            "/api/tasks/update-status",
+            data=json.dumps({"task_id": str(task["_id"]), "status": "completed"}),
+            content_type="application/json",
+            headers=headers,
+        )
+
+        response = test_client.get(
+            f"/api/tasks/stats/project/{project_id}", headers=headers
+        )
+        assert response.status_code == 200
+        assert response.get_json() == {
+            "total": 2,
+            "by_status": {"open": 1, "completed": 1},
+        }
+
+        response = test_client.get("/api/tasks/stats/user", headers=headers)
+        assert response.get_json()["total"] == 2
+
+    def test_user_tasks_include_project(self, test_client, test_db, auth_token):
+        """Test that user tasks carry the real project id, name and owner."""
+        project_id = test_db.projects.insert_one(
+            {
+                "name": "Joined Project",
+                "description": "Looked up",
+                "owner_email": "owner@example.com",
+            }
+        ).inserted_id
+        test_db.tasks.insert_one(
+            {
+                "title": "Joined Task",
+                "description": "Has a project",
+                "project_id": str(project_id),
+                "assignee": "test@example.com",
+                "status": "open",
+            }
+        )
+
+        headers = {"Authorization": auth_token}
+        response = test_client.get("/api/tasks/user-tasks", headers=headers)
+
+        assert response.status_code == 200
+        task = response.get_json()["tasks"][0]
+        assert task["project_id"] == str(project_id)
+        assert task["project_name"] == "Joined Project"
+        assert task["project_owner"] == "owner@example.com"
+
+    def test_user_refs_dual_read(self, test_client, test_db, auth_token):
+        """Test that migrated and unmigrated tasks are both listed by project."""
+        from models.references import migrate_user_refs
+
+        user_id = test_db.users.insert_one(
+            {"full_name": "Ref User", "email": "test@example.com", "role": "user"}
+        ).inserted_id
+        project_id = ObjectId()
+        test_db.tasks.insert_many(
+            [
+                {
+                    "title": f"Task {i}",
+                    "status": "open",
+                    "project_id": str(project_id),
+                    "assignee": "test@example.com",
+                    "created_at": datetime(2024, 1, i + 1),
+                }
+                for i in range(2)
+            ]
+        )
+        # Undo the backfill on one task, as if the migration had not reached it.
+        migrate_user_refs()
+        test_db.tasks.update_one(
+            {"title": "Task 1"},
+            {"$set": {"project_id": str(project_id)}, "$unset": {"assignee_id": ""}},
+        )
+
+        migrated = test_db.tasks.find_one({"title": "Task 0"})
+        assert migrated["project_id"] == project_id
+        assert migrated["assignee_id"] == user_id
+
+        headers = {"Authorization": auth_token}
+        response = test_client.get(f"/api/tasks/project/{project_id}", headers=headers)
+        data = response.get_json()
+        assert data["total"] == 2
+        assert {task["project_id"] for task in data["tasks"]} == {str(project_id)}
+
+    def test_user_refs_assigned_before_registration(
+        self, test_client, test_db, sample_user
+    ):
+        """Test that tasks assigned before registration follow the new user."""
+        from models.references import migrate_user_refs
+
+        email = sample_user["email"]
+        test_db.users.delete_many({"email": email})
+        test_db.tasks.insert_many(
+            [
+                {"title": "Early", "status": "open", "assignee": email},
+                {"title": "Earlier", "status": "open", "assignee": email},
+            ]
+        )
+        migrate_user_refs()
+        assert test_db.tasks.find_one({"title": "Earlier"})["assignee_id"] is None
+
+        response = test_client.post(
+            "/api/auth/register",
+            data=json.dumps(sample_user),
+            content_type="application/json",
+        )
+        assert response.status_code == 201
+
+        user_id = test_db.users.find_one({"email": email})["_id"]
+        assert test_db.tasks.find_one({"title": "Earlier"})["assignee_id"] == user_id
+
+        # The migration now also fills in nulls whose user exists.
+        test_db.tasks.update_one({"title": "Earlier"}, {"$set": {"assignee_id": None}})
+        migrate_user_refs()
+        assert test_db.tasks.count_documents({"assignee_id": user_id}) == 2
+
+    def test_task_list_conditional_get(self, test_client, test_db, auth_token):
+        """Test that task lists answer 304 until a task in the scope changes."""
+        headers = {"Authorization": auth_token}
+        project_id = str(ObjectId())
+        test_client.post(
+            "/api/tasks/",
+            data=json.dumps(
+                {
+                    "title": "Versioned",
+                    "description": "Conditional GET",
+                    "project_id": project_id,
+                    "assignee": "test@example.com",
+                }
+            ),
+            content_type="application/json",
+            headers=headers,
+        )
+
+        url = f"/api/tasks/project/{project_id}"
+        first = test_client.get(url, headers=headers)
+        etag = first.headers["ETag"]
+        assert first.status_code == 200
+        assert (
+            test_client.get(url, headers={**headers, "If-None-Match": etag}).status_code
+            == 304
+        )
+
+        task_id = test_db.tasks.find_one({"title": "Versioned"})["_id"]
+        test_client.put(
+            "/api/tasks/update-status",
+            data=json.dumps({"task_id": str(task_id), "status": "completed"}),
+            content_type="application/json",
+            headers=headers,
+        )
+        changed = test_client.get(url, headers={**headers, "If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.get_json()["tasks"][0]["status"] == "completed"
+
+    def test_bulk_create_reports_per_item(self, test_client, test_db, auth_token):
+        """Test that bulk creation inserts valid tasks and reports each item."""
+        project_id = str(ObjectId())
+        task = {
+            "title": "Bulk",
+            "description": "Imported",
+            "project_id": project_id,
+            "assignee": "test@example.com",
+        }
+
+        response = test_client.post(
+            "/api/tasks/bulk",
+            data=json.dumps(
+                {"tasks": [task, {"title": "Incomplete"}, task], "ordered": False}
+            ),
+            content_type="application/json",
+            headers={"Authorization": auth_token},
+        )
+
+        assert response.status_code == 207
+        data = response.get_json()
+        assert data["created"] == 2
+        assert [result["status"] for result in data["results"]] == [
+            "created",
+            "invalid",
+            "created",
+        ]
+        assert test_db.tasks.count_documents({"title": "Bulk"}) == 2
+
+    def test_bulk_update_by_ids_and_filter(self, test_client, test_db, auth_token):
+        """Test bulk updates by task ids and by filter."""
+        headers = {"Authorization": auth_token}
+        project_id = str(ObjectId())
+        task_ids = test_db.tasks.insert_many(
+            [
+                {
+                    "title": f"Board {i}",
+                    "status": "open",
+                    "project_id": project_id,
+                    "assignee": "test@example.com",
+                }
+                for i in range(3)
+            ]
+        ).inserted_ids
+
+        response = test_client.put(
+            "/api/tasks/bulk-update",
+            data=json.dumps(
+                {
+                    "operations": [
+                        {"task_id": str(task_ids[0]), "updates": {"status": "done"}},
+                        {"task_id": str(task_ids[1]), "updates": {"status": "open"}},
+                        {"task_id": "invalid", "updates": {"status": "done"}},
+                    ]
+                }
+            ),
+            content_type="application/json",
+            headers=headers,
+        )
+        data = response.get_json()
+        assert response.status_code == 200
+        assert data["modified"] == 1
+        assert data["results"][0] == {"index": 0, "matched": 1, "modified": 1}
+        assert data["results"][1] == {"index": 1, "matched": 1, "modified": 0}
+        assert "error" in data["results"][2]
+
+        response = test_client.put(
+            "/api/tasks/bulk-update",
+            data=json.dumps(
+                {
+                    "filter": {"project_id": project_id, "status": "open"},
+                    "updates": {"status": "done"},
+                }
+            ),
+            content_type="application/json",
+            headers=headers,
+        )
+        assert response.get_json()["modified"] == 2
+        assert test_db.tasks.count_documents({"status": "done"}) == 3
+
+    def test_export_project_tasks(self, test_client, test_db, auth_token):
+        """Test streaming a project's tasks as NDJSON and CSV."""
+        headers = {"Authorization": auth_token}
+        project_id = str(ObjectId())
+        test_db.tasks.insert_many(
+            [
+                {
+                    "title": f"Export {i}",
+                    "status": "open",
+                    "project_id": project_id,
+                    "assignee": "test@example.com",
+                    "created_at": datetime(2024, 1, i + 1),
+                }
+                for i in range(3)
+            ]
+        )
+
+        response = test_client.get(
+            f"/api/tasks/project/{project_id}/export", headers=headers
+        )
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert [row["title"] for row in rows] == ["Export 2", "Export 1", "Export 0"]
+
+        response = test_client.get(
+            f"/api/tasks/project/{project_id}/export?format=csv", headers=headers
+        )
+        lines = response.data.decode().splitlines()
+        assert lines[0].startswith("_id,title,")
+        assert len(lines) == 4
@@ -1,6 +1,7 @@
 import pytest
 import json
 from bson import ObjectId
+from datetime import datetime, timedelta
 
 
 @pytest.mark.api
@@ -89,7 +90,7 @@ class TestAdminUserManagement:
 
         # Update data matching frontend format
         update_data = {
-            "user_id": str(user_id),
+            "_id": str(user_id),
             "email": "updated@example.com",
             "full_name": "Updated Name",
         }
@@ -102,7 +103,41 @@ class TestAdminUserManagement:
             headers=headers,
         )
 
+        # The email change is carried over to tasks and projects by a job.
+        assert response.status_code == 202
+        job = test_db.jobs.find_one({"type": "rename_email"})
+        assert job["created_by"] == "admin@example.com"
+
+    def test_password_change_revokes_refresh_tokens(
+        self, test_client, test_db, admin_token
+    ):
+        """Test that changing a password signs the user out everywhere."""
+        user_id = ObjectId()
+        test_db.users.insert_one(
+            {
+                "_id": user_id,
+                "full_name": "Signed In",
+                "email": "signed-in@example.com",
+                "role": "user",
+            }
+        )
+        test_db.refresh_tokens.insert_one(
+            {
+                "_id": "token-hash",
+                "user_id": str(user_id),
+                "expires_at": datetime.utcnow() + timedelta(days=1),
+            }
+        )
+
+        response = test_client.put(
+            "/api/users/update",
+            data=json.dumps({"_id": str(user_id), "password": "new-secret"}),
+            content_type="application/json",
+            headers={"Authorization": admin_token},
+        )
+
         assert response.status_code == 200
+        assert test_db.refresh_tokens.count_documents({"user_id": str(user_id)}) == 0
 
     def test_admin_delete_user_success(self, test_client, test_db, admin_token):
         """Test admin successfully deleting a user."""
@@ -266,3 +301,171 @@ class TestAdminUserManagement:
         )
 
         assert response.status_code == 400
+
+    def test_admin_prefix_search_users(self, test_client, test_db, admin_token):
+        """Test accent-insensitive prefix search over name words and email."""
+        for user in [
+            {"full_name": "Émile Zola", "email": "emile@example.com"},
+            {"full_name": "Jane Smith", "email": "jane@example.com"},
+        ]:
+            test_client.post(
+                "/api/auth/register",
+                data=json.dumps({**user, "password": "password123"}),
+                content_type="application/json",
+            )
+
+        headers = {"Authorization": admin_token}
+        response = test_client.get(
+            "/api/users/?search=emi&search_mode=prefix", headers=headers
+        )
+        assert response.status_code == 200
+        names = [user["full_name"] for user in response.get_json()["users"]]
+        assert names == ["Émile Zola"]
+
+        response = test_client.get(
+            "/api/users/?search=smi&search_mode=prefix&role=user", headers=headers
+        )
+        names = [user["full_name"] for user in response.get_json()["users"]]
+        assert names == ["Jane Smith"]
+
+    def test_admin_delete_user_cascade_runs_as_job(
+        self, test_client, test_db, admin_token
+    ):
+        """Test that a large cascade delete is reported through a job."""
+        config = test_client.application.config
+        original = (config["CASCADE_BACKGROUND_THRESHOLD"], config["JOB_WORKERS"])
+        user_id = ObjectId()
+        test_db.users.insert_one(
+            {
+                "_id": user_id,
+                "full_name": "Busy User",
+                "email": "busy@example.com",
+                "role": "user",
+            }
+        )
+        test_db.tasks.insert_many(
+            [
+                {"title": f"Task {i}", "status": "open", "assignee": "busy@example.com"}
+                for i in range(3)
+            ]
+        )
+
+        headers = {"Authorization": admin_token}
+        try:
+            # Run the job inline so its outcome is known when the request returns.
+            config["CASCADE_BACKGROUND_THRESHOLD"] = 0
+            config["JOB_WORKERS"] = 0
+            response = test_client.delete(
+                "/api/users/delete",
+                data=json.dumps({"id": str(user_id)}),
+                content_type="application/json",
+                headers=headers,
+            )
+        finally:
+            config["CASCADE_BACKGROUND_THRESHOLD"], config["JOB_WORKERS"] = original
+
+        assert response.status_code == 202
+        job = test_client.get(
+            f"/api/jobs/{response.get_json()['job_id']}", headers=headers
+        ).get_json()
+        assert job["status"] == "completed"
+        assert job["result"] == {"tasks": 3, "projects": 0, "users": 1}
+        assert test_db.users.count_documents({"_id": user_id}) == 0
+        assert test_db.tasks.count_documents({"assignee": "busy@example.com"}) == 0
+
+    def test_admin_email_change_renames_references_in_job(
+        self, test_client, test_db, admin_token
+    ):
+        """Test that an email change returns a job that moves tasks and projects."""
+        config = test_client.application.config
+        original_workers = config["JOB_WORKERS"]
+        user_id = ObjectId()
+        test_db.users.insert_one(
+            {
+                "_id": user_id,
+                "full_name": "Renamed User",
+                "email": "old@example.com",
+                "role": "user",
+            }
+        )
+        test_db.tasks.insert_many(
+            [
+                {"title": f"Task {i}", "status": "open", "assignee": "old@example.com"}
+                for i in range(3)
+            ]
+        )
+        test_db.projects.insert_one({"name": "Owned", "owner_email": "old@example.com"})
+
+        headers = {"Authorization": admin_token}
+        try:
+            config["JOB_WORKERS"] = 0
+            response = test_client.put(
+                "/api/users/update",
+                data=json.dumps({"_id": str(user_id), "email": "new@example.com"}),
+                content_type="application/json",
+                headers=headers,
+            )
+        finally:
+            config["JOB_WORKERS"] = original_workers
+
+        assert response.status_code == 202
+        job = test_client.get(
+            f"/api/jobs/{response.get_json()['job_id']}", headers=headers
+        ).get_json()
+        assert job["status"] == "completed"
+        assert job["progress"] == {"tasks": 3, "projects": 1}
+        assert test_db.tasks.count_documents({"assignee": "new@example.com"}) == 3
+        assert test_db.projects.count_documents({"owner_email": "new@example.com"}) == 1
+
+    def test_typeahead_prefix_and_conditional_get(
+        self, test_client, test_db, auth_token
+    ):
+        """Test that the typeahead returns projected matches and honours ETags."""
+        test_db.users.insert_many(
+            [
+                {"full_name": "Anna", "email": "anna@example.com", "password": b"x"},
+                {"full_name": "Andy", "email": "andy@example.com", "password": b"x"},
+                {"full_name": "Bert", "email": "bert@example.com", "password": b"x"},
+            ]
+        )
+
+        headers = {"Authorization": auth_token}
+        response = test_client.get("/api/users/typeahead?q=an&limit=5", headers=headers)
+        assert response.status_code == 200
+        assert response.get_json()["users"] == [
+            {"email": "andy@example.com", "full_name": "Andy"},
+            {"email": "anna@example.com", "full_name": "Anna"},
+        ]
+        assert "max-age" in response.headers["Cache-Control"]
+
+        cached = test_client.get(
+            "/api/users/typeahead?q=an&limit=5",
+            headers={**headers, "If-None-Match": response.headers["ETag"]},
+        )
+        assert cached.status_code == 304
+
+    def test_admin_fetch_users_sparse_fields(self, test_client, test_db, admin_token):
+        """Test that user lists never return secrets and honour ``fields``."""
+        test_db.users.insert_one(
+            {
+                "full_name": "John Doe",
+                "email": "john@example.com",
+                "role": "user",
+                "password": b"hash",
+                "search_keys": ["john"],
+            }
+        )
+        headers = {"Authorization": admin_token}
+
+        response = test_client.get("/api/users/", headers=headers)
+        assert response.status_code == 200
+        user = response.get_json()["users"][0]
+        assert "password" not in user
+        assert "search_keys" not in user
+
+        response = test_client.get("/api/users/?fields=email", headers=headers)
+        assert response.status_code == 200
+        assert set(response.get_json()["users"][0]) == {"_id", "email"}
+
+        response = test_client.get("/api/users/?fields=password", headers=headers)
+        assert response.status_code == 400
@@ -0,0 +1,173 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+# Whether each client can run multi-document transactions, keyed by ``id``.
+_transaction_support = {}
+
+
+def transactions_supported(client):
+    """
+    True when ``client`` is connected to a replica set or a sharded cluster.
+
+    Standalone servers reject transactions, so callers fall back to running
+    each batch without a session there.
+    """
+    key = id(client)
+    if key not in _transaction_support:
+        try:
+            hello = client.admin.command("hello")
+            _transaction_support[key] = (
+                "setName" in hello or hello.get("msg") == "isdbgrid"
+            )
+        except Exception as e:
+            logger.warning(f"Could not detect transaction support: {e}")
+            _transaction_support[key] = False
+    return _transaction_support[key]
+
+
+def in_transaction(client, callback):
+    """
+    Run ``callback(session)`` inside a transaction when the deployment
+    supports one, otherwise run ``callback(None)`` directly.
+
+    ``callback`` may be retried on transient errors, so it must only use the
+    session it is given and have no other side effects.
+    """
+    if not transactions_supported(client):
+        return callback(None)
+    with client.start_session() as session:
+        return session.with_transaction(callback)
+
+
+def delete_in_batches(
+    client,
+    collection,
+    query,
+    batch_size=DEFAULT_BATCH_SIZE,
+    projection=None,
+    on_batch=None,
+    progress=None,
+):
+    """
+    Delete every document matching ``query``, ``batch_size`` at a time.
+
+    Each batch is read and deleted in its own transaction, so no single
+    operation holds locks or an oplog entry for the whole set, and an
+    interrupted run can simply be repeated.
+
+    Args:
+        client: PyMongo client, used to start sessions
+        collection: Collection to delete from
+        query (dict): Filter selecting the documents to delete
+        batch_size (int): Documents per batch
+        projection (dict, optional): Fields ``on_batch`` needs
+        on_batch (callable, optional): ``on_batch(documents, session)``, run
+            in the same transaction as the delete of ``documents``
+        progress (callable, optional): ``progress(deleted)`` after each batch
+
+    Returns:
+        int: Number of documents deleted
+    """
+    projection = projection or {"_id": 1}
+
+    def delete_batch(session):
+        documents = list(
+            collection.find(query, projection, session=session)
+            .sort("_id", 1)
+            .limit(batch_size)
+        )
+        if not documents:
+            return 0
+        ids = [document["_id"] for document in documents]
+        result = collection.delete_many({"_id": {"$in": ids}}, session=session)
+        if on_batch:
+            on_batch(documents, session)
+        return result.deleted_count
+
+    deleted = 0
+    while True:
+        count = in_transaction(client, delete_batch)
+        if not count:
+            return deleted
+        deleted += count
+        if progress:
+            progress(deleted)
+
+
+def update_in_batches(
+    collection,
+    query,
+    update,
+    batch_size=DEFAULT_BATCH_SIZE,
+    start_after=None,
+    progress=None,
+):
+    """
+    Apply ``update`` to every document matching ``query`` in ``_id`` order,
+    ``batch_size`` documents at a time.
+
+    Args:
+        collection: Collection to update
+        query (dict): Filter selecting the documents to update
+        update (dict): Update document applied to each batch
+        batch_size (int): Documents per batch
+        start_after (ObjectId, optional): Resume after this ``_id``
+        progress (callable, optional): ``progress(updated, last_id)`` after
+            each batch, suitable for checkpointing
+
+    Returns:
+        int: Number of documents modified
+    """
+    updated = 0
+    last_id = start_after
+    while True:
+        batch_query = query if last_id is None else {**query, "_id": {"$gt": last_id}}
+        ids = [
+            document["_id"]
+            for document in collection.find(batch_query, {"_id": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+        ]
+        if not ids:
+            return updated
+        result = collection.update_many({**query, "_id": {"$in": ids}}, update)
+        updated += result.modified_count
+        last_id = ids[-1]
+        if progress:
+            progress(updated, last_id)
+
+
+def cascade_delete(client, steps, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Run a cascade of batched deletes in order.
+
+    Dependents should come first and the root document last, so a cascade
+    that stops halfway leaves the root in place and can be run again.
+
+    Args:
+        client: PyMongo client, used to start sessions
+        steps (list): ``(name, collection, query, projection, on_batch)``
+            tuples, see :func:`delete_in_batches`
+        batch_size (int): Documents per batch
+        progress (callable, optional): ``progress(deleted)`` with the counts
+            deleted so far, per step name
+
+    Returns:
+        dict: Number of documents deleted per step name
+    """
+    deleted = {name: 0 for name, *_ in steps}
+
+    for name, collection, query, projection, on_batch in steps:
+
+        def report(count, name=name):
+            deleted[name] = count
+            if progress:
+                progress(dict(deleted))
+
+        deleted[name] = delete_in_batches(
+            client, collection, query, batch_size, projection, on_batch, report
+        )
+    return deleted
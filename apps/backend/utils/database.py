@@ -1,65 +1,290 @@
+import functools
 import os
-from pymongo import MongoClient
+import threading
+from pymongo import MongoClient, monitoring, uri_parser
 from pymongo.database import Database
 from typing import Optional
 import logging
-import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_DB_NAME = "app_db"
+DEFAULT_MAX_POOL_SIZE = 100
+DEFAULT_MIN_POOL_SIZE = 0
+DEFAULT_WAIT_QUEUE_TIMEOUT_MS = 10000
+DEFAULT_TIMEOUT_MS = 10000
 
+# The app and the maintenance tools share one client per process. It is
+# created lazily with ``connect=False`` and rebuilt in forked children, so a
+# pre-fork server never hands its workers the master's sockets or monitors.
+_lock = threading.Lock()
 _client: Optional[MongoClient] = None
-_database: Optional[Database] = None
+_client_pid: Optional[int] = None
+_uri: Optional[str] = None
+_options: Optional[dict] = None
+_extension_bound = False
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters per server, fed by PyMongo's pool events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers = {}
+
+    def _count(self, address, **changes):
+        key = "%s:%s" % address
+        with self._lock:
+            server = self._servers.setdefault(
+                key,
+                {
+                    "open": 0,
+                    "in_use": 0,
+                    "created": 0,
+                    "closed": 0,
+                    "checkouts": 0,
+                    "checkout_failures": 0,
+                    "wait_queue_timeouts": 0,
+                    "cleared": 0,
+                },
+            )
+            for name, delta in changes.items():
+                server[name] += delta
+
+    def pool_created(self, event):
+        self._count(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._count(event.address, cleared=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._count(event.address, open=1, created=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._count(event.address, open=-1, closed=1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        timeout = event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT
+        self._count(
+            event.address, checkout_failures=1, wait_queue_timeouts=int(timeout)
+        )
+
+    def connection_checked_out(self, event):
+        self._count(event.address, in_use=1, checkouts=1)
+
+    def connection_checked_in(self, event):
+        self._count(event.address, in_use=-1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {key: dict(server) for key, server in self._servers.items()}
+
+    def reset(self):
+        with self._lock:
+            self._servers.clear()
+
+
+pool_listener = PoolStats()
+
+
+def mongo_client_options(config) -> dict:
+    """
+    Build ``MongoClient`` keyword arguments from app config.
+
+    Timeouts of 0 mean "no timeout". ``MONGO_COMPRESSORS`` is a
+    comma-separated list such as ``"zstd,zlib"``; the server picks the first
+    one it supports.
+
+    Args:
+        config: Flask config or any mapping with the ``MONGO_*`` keys
+
+    Returns:
+        dict: Client options
+    """
+
+    def timeout(key, default):
+        value = config.get(key, default)
+        return int(value) or None
+
+    options = {
+        "maxPoolSize": int(config.get("MONGO_MAX_POOL_SIZE", DEFAULT_MAX_POOL_SIZE)),
+        "minPoolSize": int(config.get("MONGO_MIN_POOL_SIZE", DEFAULT_MIN_POOL_SIZE)),
+        "waitQueueTimeoutMS": timeout(
+            "MONGO_WAIT_QUEUE_TIMEOUT_MS", DEFAULT_WAIT_QUEUE_TIMEOUT_MS
+        ),
+        "serverSelectionTimeoutMS": timeout(
+            "MONGO_SERVER_SELECTION_TIMEOUT_MS", DEFAULT_TIMEOUT_MS
+        ),
+        "connectTimeoutMS": timeout("MONGO_CONNECT_TIMEOUT_MS", DEFAULT_TIMEOUT_MS),
+        "socketTimeoutMS": timeout("MONGO_SOCKET_TIMEOUT_MS", 0),
+        "retryWrites": True,
+    }
+    if config.get("MONGO_COMPRESSORS"):
+        options["compressors"] = config["MONGO_COMPRESSORS"]
+    return options
+
+
+def redact_uri(uri: str) -> str:
+    """
+    Return ``uri`` with its credentials hidden, for logging.
+
+    Args:
+        uri (str): MongoDB connection string
+
+    Returns:
+        str: The connection string with ``user:password@`` replaced by ``***@``
+    """
+    scheme, separator, rest = uri.partition("://")
+    hosts, slash, path = rest.partition("/")
+    if not separator or "@" not in hosts:
+        return uri
+    return f"{scheme}://***@{hosts.rpartition('@')[2]}{slash}{path}"
+
+
+def create_mongo_client(uri: str, **options) -> MongoClient:
+    """
+    Create a client that connects on first use and reports pool events to
+    :data:`pool_listener`.
+
+    Args:
+        uri (str): MongoDB connection string
+        **options: Extra ``MongoClient`` options, see :func:`mongo_client_options`
+
+    Returns:
+        MongoClient: MongoDB client instance
+    """
+    return MongoClient(uri, connect=False, event_listeners=[pool_listener], **options)
 
 
 def get_mongo_client() -> MongoClient:
     """
-    Get MongoDB client instance (singleton pattern).
+    Get the MongoDB client of this process.
+
+    Uses the URI and options given to :func:`init_mongo`, or ``MONGO_URI``
+    and the default options outside the app. No connection is made here;
+    server selection waits up to ``serverSelectionTimeoutMS`` on first use.
 
     Returns:
         MongoClient: MongoDB client instance
     """
-    global _client
-
-    if _client is None:
-        mongo_uri = os.getenv("MONGO_URI")
-        if not mongo_uri:
-            raise ValueError("MONGO_URI environment variable is not set")
-
-        try:
-            # Create client with connection timeout settings for better reliability
-            _client = MongoClient(
-                mongo_uri,
-                serverSelectionTimeoutMS=10000,  # 10 seconds
-                connectTimeoutMS=10000,  # 10 seconds
-                socketTimeoutMS=10000,  # 10 seconds
-                maxPoolSize=10,
-                retryWrites=True,
+    global _client, _client_pid
+
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            mongo_uri = _uri or os.getenv("MONGO_URI")
+            if not mongo_uri:
+                raise ValueError("MONGO_URI environment variable is not set")
+            if _client_pid != os.getpid():
+                # Counters inherited from the parent describe its pool.
+                pool_listener.reset()
+            _client = create_mongo_client(
+                mongo_uri, **(_options or mongo_client_options({}))
             )
+            _client_pid = os.getpid()
+        return _client
+
+
+def init_mongo(app):
+    """
+    Configure the shared client from ``app.config`` and bind
+    ``extensions.mongo`` (``mongo.cx``/``mongo.db``) to it.
+
+    The process keeps one client: apps built later share the client of the
+    first one. They must use the same ``MONGO_URI``; differing pool options
+    are ignored with a warning.
+
+    Args:
+        app: Flask application with ``MONGO_URI`` set
+
+    Raises:
+        ValueError: If ``MONGO_URI`` is missing or differs from the URI the
+            client was configured with
+    """
+    global _uri, _options, _extension_bound
+
+    uri = app.config.get("MONGO_URI")
+    if not uri:
+        raise ValueError("You must set the MONGO_URI Flask config variable")
+    options = mongo_client_options(app.config)
+
+    with _lock:
+        if _uri is None:
+            _uri, _options = uri, options
+            logger.info(f"Using MongoDB at {redact_uri(uri)}")
+        elif uri != _uri:
+            raise ValueError(
+                f"MongoDB is already configured for {redact_uri(_uri)} in this process"
+            )
+        elif options != _options:
+            logger.warning(
+                "Ignoring MongoDB client options of a new app; the shared "
+                "client keeps the options it was configured with"
+            )
+        _extension_bound = True
+    _bind_extension()
+
+
+def _bind_extension():
+    from extensions import mongo
+
+    mongo.cx = get_mongo_client()
+    mongo.db = get_database()
+
+
+def reset_after_fork():
+    """
+    Give a forked child its own client and rebind ``extensions.mongo``.
 
-            # Test the connection with retries
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    _client.admin.command("ping")
-                    logger.info("Successfully connected to MongoDB")
-                    break
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        raise e
-                    logger.warning(
-                        f"Connection attempt {attempt + 1} failed, retrying..."
-                    )
-                    time.sleep(2)
-
-        except Exception as e:
-            logger.error(f"Failed to connect to MongoDB: {e}")
-            _client = None
-            raise
-
-    return _client
+    Runs automatically after ``os.fork``; pre-fork servers may also call it
+    from their post-fork hook. Calling it again in the same process reuses
+    the client it created.
+    """
+    # Another thread may have held the lock when the process forked.
+    global _lock
+    _lock = threading.Lock()
+    pool_listener._lock = threading.Lock()
+    if _extension_bound:
+        _bind_extension()
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def pool_stats() -> dict:
+    """
+    Report the pool settings and per-server counters of this process.
+
+    Returns:
+        dict: ``maxPoolSize``, ``minPoolSize`` and ``servers`` counters
+            (open, in_use, created, closed, checkouts, checkout_failures,
+            wait_queue_timeouts, cleared)
+    """
+    options = _options or mongo_client_options({})
+    return {
+        "maxPoolSize": options["maxPoolSize"],
+        "minPoolSize": options["minPoolSize"],
+        "servers": pool_listener.snapshot(),
+    }
+
+
+@functools.lru_cache(maxsize=8)
+def _default_db_name(mongo_uri):
+    # Parsing a mongodb+srv URI resolves DNS, so it is done once per URI.
+    return uri_parser.parse_uri(mongo_uri)["database"] or DEFAULT_DB_NAME
 
 
 def get_database(db_name: Optional[str] = None) -> Database:
@@ -72,35 +297,12 @@ def get_database(db_name: Optional[str] = None) -> Database:
     Returns:
         Database: MongoDB database instance
     """
-    global _database
-
     client = get_mongo_client()
 
     if db_name:
         return client[db_name]
 
-    if _database is None:
-        # Extract database name from URI or use default
-        mongo_uri = os.getenv("MONGO_URI", "")
-
-        # Try to extract database name from URI
-        if "/" in mongo_uri:
-            # Split by '/' and get the last part, then remove query parameters
-            uri_parts = mongo_uri.split("/")
-            if len(uri_parts) > 3:  # mongodb://host:port/dbname
-                db_name = uri_parts[-1].split("?")[0]
-                if db_name and db_name != "":
-                    _database = client[db_name]
-                else:
-                    _database = client["app_db"]  # default database name
-            else:
-                _database = client["app_db"]  # default database name
-        else:
-            _database = client["app_db"]  # default database name
-
-        logger.info(f"Using database: {_database.name}")
-
-    return _database
+    return client[_default_db_name(_uri or os.getenv("MONGO_URI", ""))]
 
 
 def get_collection(collection_name: str, db_name: Optional[str] = None):
@@ -120,66 +322,24 @@ def get_collection(collection_name: str, db_name: Optional[str] = None):
 
 def close_connection():
     """Close the MongoDB connection."""
-    global _client, _database
+    global _client, _client_pid
 
-    if _client:
-        _client.close()
-        _client = None
-        _database = None
+    with _lock:
+        client, _client, _client_pid = _client, None, None
+    if client:
+        client.close()
         logger.info("MongoDB connection closed")
 
 
 def init_database():
     """Initialize database with any required setup (indexes, etc.)."""
-    try:
-        db = get_database()
-
-        # Create indexes for better performance
-        users_collection = db.users
-        try:
-            users_collection.create_index("email", unique=True)
-        except Exception as e:
-            logger.warning(
-                f"Index creation for users.email failed (may already exist): {e}"
-            )
-
-        try:
-            users_collection.create_index("created_at")
-        except Exception as e:
-            logger.warning(f"Index creation for users.created_at failed: {e}")
-
-        projects_collection = db.projects
-        try:
-            projects_collection.create_index("owner_email")
-        except Exception as e:
-            logger.warning(f"Index creation for projects.owner_email failed: {e}")
-
-        try:
-            projects_collection.create_index("created_at")
-        except Exception as e:
-            logger.warning(f"Index creation for projects.created_at failed: {e}")
-
-        tasks_collection = db.tasks
-        try:
-            tasks_collection.create_index("project_id")
-        except Exception as e:
-            logger.warning(f"Index creation for tasks.project_id failed: {e}")
-
-        try:
-            tasks_collection.create_index("assignee")
-        except Exception as e:
-            logger.warning(f"Index creation for tasks.assignee failed: {e}")
-
-        try:
-            tasks_collection.create_index("status")
-        except Exception as e:
-            logger.warning(f"Index creation for tasks.status failed: {e}")
-
-        try:
-            tasks_collection.create_index("created_at")
-        except Exception as e:
-            logger.warning(f"Index creation for tasks.created_at failed: {e}")
+    # Importing the models registers the indexes they declare.
+    import models.user, models.project, models.task  # noqa: F401
+    import models.refresh_token, models.job  # noqa: F401
+    from utils.indexes import ensure_indexes
 
+    try:
+        ensure_indexes(get_database())
         logger.info("Database initialized successfully")
 
     except Exception as e:
@@ -1,7 +1,106 @@
+from collections import OrderedDict
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, make_response
+from models.change_version import get_versions, ALL_SCOPE
+from utils.response_cache import (
+    get_response_cache,
+    response_cache_key,
+    DEFAULT_RESPONSE_CACHE_TTL,
+)
+import hashlib
+import threading
+import time
 import jwt
 
+DEFAULT_JWT_CACHE_SIZE = 1024
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified JWT claims.
+
+    Entries are keyed by ``(secret, token)`` so rotating ``SECRET_KEY`` can
+    never serve claims verified with the old key, and they are only served
+    until the token's ``exp``.
+    """
+
+    def __init__(self, maxsize=DEFAULT_JWT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, secret, token):
+        """Return cached claims, or None if absent or expired."""
+        key = (secret, token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, secret, token, claims):
+        if self.maxsize <= 0:
+            return
+        expires_at = claims.get("exp")
+        with self._lock:
+            self._entries[(secret, token)] = (claims, expires_at)
+            self._entries.move_to_end((secret, token))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+token_cache = TokenCache()
+
+
+def decode_token(token):
+    """
+    Verify ``token`` with the app's ``SECRET_KEY``, using the claims cache.
+
+    The cache size comes from ``JWT_CACHE_SIZE``; 0 disables caching.
+
+    Raises:
+        jwt.ExpiredSignatureError: If the token has expired
+        jwt.InvalidTokenError: If the token is otherwise invalid
+    """
+    secret = current_app.config["SECRET_KEY"]
+    token_cache.maxsize = current_app.config.get(
+        "JWT_CACHE_SIZE", DEFAULT_JWT_CACHE_SIZE
+    )
+
+    claims = token_cache.get(secret, token) if token_cache.maxsize > 0 else None
+    if claims is None:
+        # Expired entries miss, so expiry is still reported by jwt.decode.
+        claims = jwt.decode(token, secret, algorithms=["HS256"])
+        token_cache.put(secret, token, claims)
+
+    # Handlers get their own copy so they cannot alter the cached claims.
+    return dict(claims)
+
 
 def token_required(f):
     @wraps(f)
@@ -10,9 +109,7 @@ def token_required(f):
         if not token:
             return jsonify({"error": "Missing token"}), 403
         try:
-            data = jwt.decode(
-                token, current_app.config["SECRET_KEY"], algorithms=["HS256"]
-            )
+            data = decode_token(token)
         except jwt.ExpiredSignatureError:
             return jsonify({"error": "Token expired"}), 401
         except Exception:
@@ -22,6 +119,73 @@ def token_required(f):
     return decorated
 
 
+def conditional_get(scopes):
+    """
+    Answer ``If-None-Match`` with 304 while the lists a view reads are unchanged.
+
+    ``scopes(**kwargs)`` receives the view's arguments, including
+    ``current_user``, and returns the change-version scopes the response
+    depends on. The ETag is derived from those versions, the request path and
+    query, and the caller, so a matching request returns before the view
+    queries anything. Other requests are served from the response cache when
+    it holds the same list at the same versions; ``RESPONSE_CACHE_TTL`` set
+    to 0 disables it. Apply it below ``token_required``.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            # Versions are read before the view runs, so a write racing with
+            # it can only make the ETag older than the data, never newer.
+            request_scopes = [ALL_SCOPE, *scopes(**kwargs)]
+            versions = get_versions(request_scopes)
+            user = kwargs.get("current_user", {})
+            key = "|".join(
+                [
+                    request.full_path,
+                    user.get("email", ""),
+                    user.get("role", ""),
+                    *(versions[scope] for scope in request_scopes),
+                ]
+            )
+            etag = hashlib.sha1(key.encode()).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+
+            cache = get_response_cache()
+            ttl = current_app.config.get(
+                "RESPONSE_CACHE_TTL", DEFAULT_RESPONSE_CACHE_TTL
+            )
+            cache_key = response_cache_key(versions) if ttl > 0 else None
+            cached = cache.get(cache_key) if cache_key else None
+
+            if cached is not None:
+                body, mimetype = cached
+                response = current_app.response_class(body, mimetype=mimetype)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if cache_key and response.status_code == 200:
+                    cache.set(
+                        cache_key,
+                        (response.get_data(), response.mimetype),
+                        request_scopes,
+                        ttl,
+                    )
+
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
+
+
 def require_role(role):
     def decorator(f):
         @wraps(f)
@@ -0,0 +1,79 @@
+import csv
+import datetime
+import io
+from bson import ObjectId
+from flask import Response, current_app, stream_with_context
+
+EXPORT_NDJSON = "ndjson"
+EXPORT_CSV = "csv"
+EXPORT_FORMATS = {
+    EXPORT_NDJSON: "application/x-ndjson",
+    EXPORT_CSV: "text/csv",
+}
+DEFAULT_EXPORT_BATCH_SIZE = 1000
+
+
+def _value(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def _ndjson_lines(documents, fields):
+    # The app's JSON provider encodes ObjectIds and datetimes itself.
+    dumps = current_app.json.dumps
+    for document in documents:
+        row = {field: document.get(field) for field in fields}
+        yield dumps(row, sort_keys=False) + "\n"
+
+
+def _csv_lines(documents, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(fields)
+    yield flush()
+    for document in documents:
+        writer.writerow(_value(document.get(field)) for field in fields)
+        yield flush()
+
+
+def export_response(cursor, fields, fmt, filename):
+    """
+    Stream ``cursor`` as NDJSON or CSV, one line per document.
+
+    Documents are pulled from the cursor as lines are sent, so memory stays
+    flat whatever the result size. The cursor is closed when the stream ends
+    or the client goes away.
+
+    Args:
+        cursor: PyMongo cursor, ideally with a projection and ``batch_size``
+        fields (list): Columns to write, in order
+        fmt (str): One of ``EXPORT_FORMATS``
+        filename (str): Download name without extension
+
+    Raises:
+        ValueError: If ``fmt`` is unknown
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Invalid format: {fmt}")
+
+    lines = _csv_lines if fmt == EXPORT_CSV else _ndjson_lines
+
+    def generate():
+        try:
+            yield from lines(cursor, fields)
+        finally:
+            cursor.close()
+
+    response = Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
@@ -0,0 +1,118 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+from flask import current_app
+
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+class HashingPoolSaturated(Exception):
+    """Raised when no hashing slot is free; callers should answer 503."""
+
+
+# Pool workers are started by a fork server (spawn where there is none), not
+# forked from a threaded worker that may hold locks or Mongo sockets.
+_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_slots = None
+
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+def _config(key, default):
+    return current_app.config.get(key, default)
+
+
+def _workers():
+    return _config("HASH_POOL_WORKERS", os.cpu_count() or 1)
+
+
+def _get_pool():
+    """
+    Return the process pool of the current process.
+
+    The pool is created lazily and recreated after a fork, so pre-fork
+    servers never share worker processes or semaphores across processes.
+    """
+    global _pool, _pool_pid, _slots
+
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            workers = _workers()
+            queue = _config("HASH_POOL_QUEUE", workers * 4)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(_START_METHOD),
+            )
+            _pool_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(workers + queue)
+        return _pool, _slots
+
+
+def _reset_pool():
+    global _pool
+    with _lock:
+        _pool = None
+
+
+def _run(fn, *args):
+    if _workers() <= 0:
+        return fn(*args)
+
+    pool, slots = _get_pool()
+    # Shed load instead of queueing unboundedly behind slow bcrypt calls.
+    if not slots.acquire(blocking=False):
+        raise HashingPoolSaturated("Password hashing is at capacity")
+    try:
+        future = pool.submit(fn, *args)
+    except BrokenProcessPool:
+        slots.release()
+        _reset_pool()
+        raise HashingPoolSaturated("Password hashing pool restarted")
+    future.add_done_callback(lambda _: slots.release())
+
+    try:
+        return future.result(timeout=_config("HASH_POOL_TIMEOUT", 10))
+    except TimeoutError:
+        raise HashingPoolSaturated("Password hashing timed out")
+    except BrokenProcessPool:
+        _reset_pool()
+        raise HashingPoolSaturated("Password hashing pool restarted")
+
+
+def hash_password(password):
+    """Hash ``password`` with the configured ``BCRYPT_ROUNDS`` off the request thread."""
+    rounds = _config("BCRYPT_ROUNDS", DEFAULT_BCRYPT_ROUNDS)
+    return _run(_hashpw, password.encode(), rounds)
+
+
+def check_password(password, hashed):
+    """Verify ``password`` against a stored bcrypt hash off the request thread."""
+    if isinstance(hashed, str):
+        hashed = hashed.encode()
+    return _run(_checkpw, password.encode(), hashed)
+
+
+def needs_rehash(hashed):
+    """True when ``hashed`` was made with a different work factor than configured."""
+    if isinstance(hashed, str):
+        hashed = hashed.encode()
+    try:
+        rounds = int(hashed.split(b"$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != _config("BCRYPT_ROUNDS", DEFAULT_BCRYPT_ROUNDS)
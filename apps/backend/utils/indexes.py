@@ -0,0 +1,135 @@
+import logging
+import threading
+from pymongo import IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Indexes declared by the models, keyed by collection name.
+_registry = {}
+
+# Index options that change what an index can answer; indexes carrying any of
+# them are never reported as redundant.
+_SPECIAL_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+
+def register_indexes(collection, *keys_and_options):
+    """
+    Declare the indexes a model relies on.
+
+    Each entry is either a key list or a ``(keys, options)`` tuple, exactly as
+    they would be passed to ``create_index``. Builds are requested in the
+    background so they do not block writes on servers that still honour it.
+
+    Example:
+        register_indexes(
+            "users",
+            ([("email", 1)], {"unique": True}),
+            [("role", 1), ("_id", 1)],
+        )
+    """
+    models = _registry.setdefault(collection, [])
+    for entry in keys_and_options:
+        keys, options = entry if isinstance(entry, tuple) else (entry, {})
+        models.append(IndexModel(keys, background=True, **options))
+
+
+def registered_indexes():
+    """Return a copy of the registry as ``{collection: [IndexModel, ...]}``."""
+    return {name: list(models) for name, models in _registry.items()}
+
+
+def _key(spec):
+    # The server may report numeric directions as floats (``1.0``).
+    return tuple(
+        (field, direction if isinstance(direction, str) else int(direction))
+        for field, direction in spec.items()
+    )
+
+
+def _is_prefix(key, other):
+    return len(other) > len(key) and other[: len(key)] == key
+
+
+def _declared_key(model):
+    # Text indexes are stored under the internal ``_fts``/``_ftsx`` keys.
+    key = _key(model.document["key"])
+    if any(direction == "text" for _, direction in key):
+        return (("_fts", "text"), ("_ftsx", 1))
+    return key
+
+
+def ensure_indexes(db):
+    """
+    Create every registered index that does not exist yet.
+
+    Failures are logged per collection so one bad index does not stop the
+    rest from being built.
+
+    Args:
+        db: PyMongo database
+
+    Returns:
+        dict: Names of the indexes created or confirmed, per collection
+    """
+    created = {}
+    for collection, models in _registry.items():
+        try:
+            created[collection] = db[collection].create_indexes(models)
+        except Exception as e:
+            logger.warning(f"Index creation for {collection} failed: {e}")
+    return created
+
+
+def ensure_indexes_in_background(db):
+    """Run :func:`ensure_indexes` on a daemon thread so startup is not blocked."""
+    thread = threading.Thread(
+        target=ensure_indexes, args=(db,), name="ensure-indexes", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def index_drift(db):
+    """
+    Compare the indexes in ``db`` with the registry.
+
+    Returns:
+        dict: Per collection, the names of ``missing`` indexes (declared but
+        absent), ``extra`` indexes (present but not declared) and ``redundant``
+        indexes (plain indexes whose keys are a prefix of another index)
+    """
+    report = {}
+    for collection, models in _registry.items():
+        existing = {
+            spec["name"]: spec
+            for spec in db[collection].list_indexes()
+            if spec["name"] != "_id_"
+        }
+        existing_keys = {_key(spec["key"]): name for name, spec in existing.items()}
+        declared_keys = {_declared_key(model) for model in models}
+        declared_names = {model.document["name"] for model in models}
+
+        missing = [
+            model.document["name"]
+            for model in models
+            if _declared_key(model) not in existing_keys
+            and model.document["name"] not in existing
+        ]
+        extra = [
+            name
+            for key, name in existing_keys.items()
+            if key not in declared_keys and name not in declared_names
+        ]
+        redundant = [
+            name
+            for key, name in existing_keys.items()
+            if not any(option in existing[name] for option in _SPECIAL_OPTIONS)
+            and any(_is_prefix(key, other) for other in existing_keys)
+        ]
+
+        report[collection] = {
+            "missing": missing,
+            "extra": extra,
+            "redundant": redundant,
+        }
+    return report
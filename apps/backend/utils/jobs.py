@@ -0,0 +1,124 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from models.job import (
+    create_job,
+    claim_job,
+    update_job_progress,
+    finish_job,
+    get_unfinished_jobs,
+    JOB_PENDING,
+    JOB_RUNNING,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_WORKERS = 2
+
+# Job handlers, keyed by job type.
+_handlers = {}
+
+_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+
+
+def job_handler(job_type):
+    """
+    Register the function that runs jobs of ``job_type``.
+
+    The handler is called as ``handler(job, report)`` where ``job`` is the
+    stored job document and ``report(progress=None, checkpoint=None)``
+    persists progress for pollers and a checkpoint to resume from. Its return
+    value is stored as the job ``result``.
+    """
+
+    def decorator(f):
+        _handlers[job_type] = f
+        return f
+
+    return decorator
+
+
+def _get_executor():
+    # Recreated after a fork so pre-fork servers do not inherit dead threads.
+    global _executor, _executor_pid
+
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get("JOB_WORKERS", DEFAULT_JOB_WORKERS),
+                thread_name_prefix="jobs",
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def run_job(job_id, statuses=(JOB_PENDING,)):
+    """
+    Claim and run a job in the current thread.
+
+    Returns:
+        bool: False if the job was not claimable (already taken or finished)
+    """
+    job = claim_job(job_id, statuses)
+    if not job:
+        return False
+
+    def report(progress=None, checkpoint=None):
+        update_job_progress(job_id, progress, checkpoint)
+
+    try:
+        result = _handlers[job["type"]](job, report)
+    except Exception as e:
+        logger.exception(f"Job {job_id} ({job['type']}) failed")
+        finish_job(job_id, error=str(e))
+    else:
+        finish_job(job_id, result=result)
+    return True
+
+
+def _run_in_context(app, job_id):
+    with app.app_context():
+        run_job(job_id)
+
+
+def submit_job(job_type, params, created_by=None):
+    """
+    Store a job and run it on the background pool.
+
+    With ``JOB_WORKERS`` set to 0 the job runs before this returns, which
+    keeps tests and single-process tools deterministic.
+
+    Returns:
+        str: The job id to poll at ``/api/jobs/<id>``
+    """
+    if job_type not in _handlers:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    job_id = str(create_job(job_type, params, created_by)["_id"])
+    if current_app.config.get("JOB_WORKERS", DEFAULT_JOB_WORKERS) <= 0:
+        run_job(job_id)
+    else:
+        app = current_app._get_current_object()
+        _get_executor().submit(_run_in_context, app, job_id)
+    return job_id
+
+
+def resume_jobs():
+    """
+    Run every pending or interrupted job in the current thread.
+
+    Meant for a maintenance command after a crash; handlers resume from their
+    last checkpoint.
+
+    Returns:
+        int: Number of jobs run
+    """
+    ran = 0
+    for job in get_unfinished_jobs():
+        if run_job(str(job["_id"]), statuses=(JOB_PENDING, JOB_RUNNING)):
+            ran += 1
+    return ran
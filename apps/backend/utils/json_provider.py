@@ -0,0 +1,76 @@
+import base64
+import datetime
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+
+def _default(o):
+    """Encode the BSON and Python types that documents carry to JSON."""
+    if isinstance(o, ObjectId):
+        return str(o)
+    # Before Flask's default, which writes datetimes as HTTP dates.
+    if isinstance(o, (datetime.datetime, datetime.date)):
+        return o.isoformat()
+    if isinstance(o, (bytes, bytearray, memoryview)):
+        return base64.b64encode(o).decode("ascii")
+    return DefaultJSONProvider.default(o)
+
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes MongoDB documents as they come back from
+    PyMongo: ObjectIds as strings, datetimes in ISO 8601 and bytes as base64.
+
+    It replaces Flask-PyMongo's provider, whose Extended JSON output
+    (``{"$oid": ...}``) routes worked around by converting fields by hand.
+    Uses orjson when it is installed and falls back to the standard library
+    otherwise; both produce the same JSON. Install with
+    ``app.json = MongoJSONProvider(app)``.
+    """
+
+    default = staticmethod(_default)
+
+    # Options the orjson path understands; anything else (e.g. ``cls``) goes
+    # to the standard library.
+    _ORJSON_KWARGS = {"indent", "separators", "sort_keys", "ensure_ascii", "default"}
+
+    def _orjson_dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(
+            obj, default=kwargs.get("default", self.default), option=option
+        )
+
+    def _use_orjson(self, kwargs):
+        return HAS_ORJSON and kwargs.keys() <= self._ORJSON_KWARGS
+
+    def dumps(self, obj, **kwargs):
+        if self._use_orjson(kwargs):
+            return self._orjson_dumps(obj, **kwargs).decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if HAS_ORJSON and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not HAS_ORJSON:
+            return super().response(*args, **kwargs)
+
+        # orjson already returns UTF-8 bytes, so skip the str round trip.
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self._orjson_dumps(obj, indent=indent) + b"\n", mimetype=self.mimetype
+        )
@@ -0,0 +1,508 @@
+import bisect
+import hmac
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from flask import current_app, g, jsonify, request
+from pymongo import monitoring
+from utils.database import pool_stats
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+DEFAULT_FLUSH_INTERVAL = 5
+
+# Pool values that keep counting after a worker exits; the others describe
+# the connections a live worker holds.
+POOL_COUNTERS = (
+    "created",
+    "closed",
+    "checkouts",
+    "checkout_failures",
+    "wait_queue_timeouts",
+    "cleared",
+)
+DEAD_WORKERS_FILE = "dead.json"
+
+# Metrics are kept per process. With ``METRICS_DIR`` set (gunicorn sets it)
+# every worker also writes its samples to a file there, and a scrape, which
+# reaches a single worker, merges the files of all of them.
+_registry = []
+_directory = None
+_flush_interval = DEFAULT_FLUSH_INTERVAL
+_worker_lock = threading.Lock()
+_worker_pid = None
+_worker_file = None
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names."""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def combine(value, other):
+        return value + other
+
+    def samples(self, values):
+        for labels, value in values.items():
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets.
+
+    ``observe`` bumps a single bucket and the sum under a lock; cumulative
+    bucket counts are only computed when the metrics are rendered.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, labels, value):
+        # Bucket bounds are inclusive ("le"), hence bisect_left.
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                labels: (list(counts), total)
+                for labels, (counts, total) in self._series.items()
+            }
+
+    @staticmethod
+    def combine(value, other):
+        counts = [count + more for count, more in zip(value[0], other[0])]
+        return counts, value[1] + other[1]
+
+    def samples(self, series):
+        for labels, (counts, total) in series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    _labels(self.labelnames, labels, f'le="{bound}"'),
+                    cumulative,
+                )
+            yield f"{self.name}_sum", _labels(self.labelnames, labels), total
+            yield f"{self.name}_count", _labels(self.labelnames, labels), cumulative
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time to build the response, by route template.",
+    ("method", "route", "status"),
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    "http_response_size_bytes",
+    "Response body size, when known before streaming.",
+    ("method", "route"),
+    SIZE_BUCKETS,
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command round trip time.",
+    ("command", "collection"),
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongodb_command_failures_total",
+    "MongoDB commands that returned an error.",
+    ("command", "collection"),
+)
+MONGO_CHECKOUT_SECONDS = Histogram(
+    "mongodb_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection, including failed waits.",
+)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command by command name and collection."""
+
+    def __init__(self):
+        # (connection, request id) -> labels; dict operations are atomic.
+        self._pending = {}
+
+    def started(self, event):
+        command = event.command_name
+        target = event.command.get("collection" if command == "getMore" else command)
+        self._pending[(event.connection_id, event.request_id)] = (
+            command,
+            target if isinstance(target, str) else "",
+        )
+
+    def succeeded(self, event):
+        labels = self._pending.pop((event.connection_id, event.request_id), None)
+        if labels:
+            MONGO_COMMAND_SECONDS.observe(labels, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        labels = self._pending.pop((event.connection_id, event.request_id), None)
+        if labels:
+            MONGO_COMMAND_SECONDS.observe(labels, event.duration_micros / 1e6)
+            MONGO_COMMAND_FAILURES.inc(labels)
+
+
+class CheckoutMetrics(monitoring.ConnectionPoolListener):
+    """Records how long operations wait for a pooled connection."""
+
+    def connection_checked_out(self, event):
+        if event.duration is not None:
+            MONGO_CHECKOUT_SECONDS.observe((), event.duration)
+
+    def connection_check_out_failed(self, event):
+        if event.duration is not None:
+            MONGO_CHECKOUT_SECONDS.observe((), event.duration)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+_listeners_registered = False
+
+
+def _register_listeners():
+    # Global listeners apply to clients created afterwards, so this runs
+    # before ``init_mongo``; forked workers build their clients later still.
+    global _listeners_registered
+    if not _listeners_registered:
+        monitoring.register(CommandMetrics())
+        monitoring.register(CheckoutMetrics())
+        _listeners_registered = True
+
+
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+    if _directory is not None and _worker_pid != os.getpid():
+        _start_reporting()
+
+
+def _record_response(response):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return response
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"
+    HTTP_REQUEST_SECONDS.observe(
+        (request.method, route, response.status_code),
+        time.perf_counter() - started,
+    )
+    # Streamed responses (exports) have no length until they are sent.
+    if response.content_length is not None:
+        HTTP_RESPONSE_BYTES.observe((request.method, route), response.content_length)
+    return response
+
+
+def _pool_samples(servers):
+    yield "# HELP mongodb_pool_max_size Configured maxPoolSize."
+    yield "# TYPE mongodb_pool_max_size gauge"
+    yield f"mongodb_pool_max_size {pool_stats()['maxPoolSize']}"
+    for name, key, kind in (
+        ("mongodb_pool_connections_open", "open", "gauge"),
+        ("mongodb_pool_connections_in_use", "in_use", "gauge"),
+        ("mongodb_pool_checkouts_total", "checkouts", "counter"),
+        ("mongodb_pool_checkout_failures_total", "checkout_failures", "counter"),
+        ("mongodb_pool_wait_queue_timeouts_total", "wait_queue_timeouts", "counter"),
+    ):
+        yield f"# HELP {name} Connection pool {key.replace('_', ' ')} per server."
+        yield f"# TYPE {name} {kind}"
+        for server, counters in servers.items():
+            yield f"{name}{_labels(('server',), (server,))} {counters.get(key, 0)}"
+
+
+def _write_json(path, data):
+    # Written aside and renamed, so readers never see a partial file.
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _dump(values, servers):
+    return {
+        "metrics": {
+            name: [[list(labels), value] for labels, value in series.items()]
+            for name, series in values.items()
+        },
+        "pool": servers,
+    }
+
+
+def _merge(values, servers, data, live=True):
+    """Add the samples of one metrics file to ``values`` and ``servers``."""
+    metrics = {metric.name: metric for metric in _registry}
+    for name, samples in data.get("metrics", {}).items():
+        metric = metrics.get(name)
+        if metric is None:
+            continue
+        series = values.setdefault(name, {})
+        for labels, value in samples:
+            labels = tuple(labels)
+            series[labels] = (
+                metric.combine(series[labels], value) if labels in series else value
+            )
+    for server, counters in data.get("pool", {}).items():
+        merged = servers.setdefault(server, {})
+        for key, value in counters.items():
+            if live or key in POOL_COUNTERS:
+                merged[key] = merged.get(key, 0) + value
+
+
+def _flush_forever():
+    while True:
+        time.sleep(_flush_interval)
+        try:
+            flush_metrics()
+        except Exception as e:
+            logger.warning(f"Writing metrics failed: {e}")
+
+
+def _start_reporting():
+    """Give this process its metrics file and a thread that keeps it current."""
+    global _worker_pid, _worker_file
+
+    with _worker_lock:
+        if _worker_pid == os.getpid():
+            return
+        _worker_pid = os.getpid()
+        # The start time tells apart workers that reuse a pid.
+        _worker_file = os.path.join(
+            _directory, f"worker-{_worker_pid}-{time.time_ns()}.json"
+        )
+        threading.Thread(
+            target=_flush_forever, name="metrics-flush", daemon=True
+        ).start()
+
+
+def _reset_after_fork():
+    # Another thread may have held the lock when the process forked.
+    global _worker_lock
+    _worker_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def flush_metrics():
+    """
+    Write the samples of this process to ``METRICS_DIR``.
+
+    Does nothing without ``METRICS_DIR`` or before the process has served a
+    request. Gunicorn calls it when a worker exits so its last samples count.
+    """
+    if _directory is None or _worker_pid != os.getpid():
+        return
+    values = {metric.name: metric.snapshot() for metric in _registry}
+    _write_json(_worker_file, _dump(values, pool_stats()["servers"]))
+
+
+def mark_process_dead(pid, directory=None):
+    """
+    Fold the metrics files of the exited worker ``pid`` into ``dead.json``.
+
+    Counters and histograms of recycled workers keep counting towards the
+    totals; their pool gauges are dropped. Call it from the gunicorn master's
+    ``child_exit`` hook.
+
+    Args:
+        pid (int): Process id of the worker
+        directory (str, optional): Metrics directory; ``METRICS_DIR`` by default
+    """
+    directory = directory or _directory or os.getenv("METRICS_DIR")
+    if not directory:
+        return
+    names = [
+        name
+        for name in os.listdir(directory)
+        if name.startswith(f"worker-{pid}-") and name.endswith(".json")
+    ]
+    if not names:
+        return
+
+    path = os.path.join(directory, DEAD_WORKERS_FILE)
+    values, servers = {}, {}
+    _merge(values, servers, _read_json(path) or {}, live=False)
+    for name in names:
+        data = _read_json(os.path.join(directory, name)) or {}
+        _merge(values, servers, data, live=False)
+    # Readers skip worker files listed in ``merged``, so a file read just
+    # before it was folded in is not counted twice.
+    _write_json(path, {**_dump(values, servers), "merged": names})
+    for name in names:
+        os.remove(os.path.join(directory, name))
+
+
+def _collect():
+    """Samples of this process, or of every worker with ``METRICS_DIR``."""
+    if _directory is None:
+        values = {metric.name: metric.snapshot() for metric in _registry}
+        return values, pool_stats()["servers"]
+
+    _start_reporting()
+    flush_metrics()
+    workers = {}
+    for name in os.listdir(_directory):
+        if name.startswith("worker-") and name.endswith(".json"):
+            data = _read_json(os.path.join(_directory, name))
+            if data:
+                workers[name] = data
+
+    # Read last: a worker folded in after its file was read is listed here.
+    values, servers = {}, {}
+    dead = _read_json(os.path.join(_directory, DEAD_WORKERS_FILE))
+    if dead:
+        _merge(values, servers, dead, live=False)
+        for name in dead.get("merged", ()):
+            workers.pop(name, None)
+    for data in workers.values():
+        _merge(values, servers, data)
+    return values, servers
+
+
+def render_metrics():
+    """Render every metric in the Prometheus text format."""
+    values, servers = _collect()
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(
+            f"{name}{labels} {value}"
+            for name, labels, value in metric.samples(values.get(metric.name, {}))
+        )
+    lines.extend(_pool_samples(servers))
+    return "\n".join(lines) + "\n"
+
+
+def metrics():
+    token = current_app.config.get("METRICS_TOKEN")
+    if not token:
+        # Without a token the endpoint is only open on development servers.
+        if not (current_app.debug or current_app.testing):
+            return jsonify({"error": "METRICS_TOKEN is not configured"}), 403
+    elif not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return jsonify({"error": "Unauthorized"}), 401
+    return current_app.response_class(
+        render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE
+    )
+
+
+def init_metrics(app):
+    """
+    Record request and MongoDB metrics for ``app`` and serve them at
+    ``/api/metrics``.
+
+    Does nothing when ``METRICS_ENABLED`` is false. Scrapes must send
+    ``Authorization: Bearer <METRICS_TOKEN>``; without a token the endpoint
+    answers 403 except in debug and testing. With ``METRICS_DIR`` set the
+    metrics of every worker process are merged, see :func:`mark_process_dead`.
+    Call it before ``init_mongo`` so the client reports its commands.
+
+    Args:
+        app: Flask application
+    """
+    global _directory, _flush_interval
+
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    _directory = app.config.get("METRICS_DIR") or None
+    _flush_interval = app.config.get("METRICS_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL)
+    _register_listeners()
+    app.before_request(_start_timer)
+    app.after_request(_record_response)
+    app.add_url_rule("/api/metrics", view_func=metrics, methods=["GET"])
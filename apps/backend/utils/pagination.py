@@ -0,0 +1,288 @@
+import base64
+import binascii
+from collections import namedtuple
+from bson import json_util
+
+# ``total`` is None when counting was skipped; ``total_capped`` is True when the
+# real total is larger than the requested cap and ``total`` holds the cap.
+Page = namedtuple("Page", ["items", "next_cursor", "total", "total_capped"])
+
+COUNT_EXACT = "exact"
+COUNT_NONE = "none"
+
+DEFAULT_PAGE_SIZE = 10
+DEFAULT_MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded or does not match the sort."""
+
+
+def encode_cursor(document, sort):
+    """
+    Build an opaque cursor pointing just after ``document`` in ``sort`` order.
+
+    Args:
+        document (dict): Last document of the current page
+        sort (list): Sort specification as ``[(field, direction), ...]``
+
+    Returns:
+        str: URL-safe cursor string
+    """
+    payload = {
+        "k": [field for field, _ in sort],
+        "v": [document.get(field) for field, _ in sort],
+    }
+    raw = json_util.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    """
+    Decode a cursor produced by :func:`encode_cursor`.
+
+    Args:
+        cursor (str): Cursor string sent by the client
+        sort (list): Sort specification the cursor must have been built with
+
+    Returns:
+        list: Sort key values of the last document seen
+
+    Raises:
+        InvalidCursor: If the cursor is malformed or was built for another sort
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+        keys, values = payload["k"], payload["v"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor("Invalid cursor")
+
+    if keys != [field for field, _ in sort] or len(values) != len(sort):
+        raise InvalidCursor("Cursor does not match the requested sort")
+    return values
+
+
+def _after(field, direction, value):
+    """Conditions matching values of ``field`` that sort after ``value``."""
+    # Missing/null values sort before everything else in MongoDB, and range
+    # operators never match them, so they need to be handled explicitly.
+    if direction < 0:
+        if value is None:
+            return []
+        if field == "_id":
+            return [{field: {"$lt": value}}]
+        return [{field: {"$lt": value}}, {field: None}]
+    if value is None:
+        return [{field: {"$ne": None}}]
+    return [{field: {"$gt": value}}]
+
+
+def keyset_filter(sort, values):
+    """
+    Build the query selecting documents strictly after ``values`` in ``sort`` order.
+
+    Args:
+        sort (list): Sort specification as ``[(field, direction), ...]``
+        values (list): Sort key values of the last document seen
+
+    Returns:
+        dict: MongoDB filter
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        prefix = {sort[j][0]: values[j] for j in range(i)}
+        for condition in _after(field, direction, values[i]):
+            clauses.append({**prefix, **condition})
+    return {"$or": clauses} if clauses else {"_id": {"$exists": False}}
+
+
+def parse_count(args):
+    """
+    Read the ``count`` query parameter of list endpoints.
+
+    Accepted values are ``"exact"``, ``"none"`` or a positive integer cap.
+    Cursor clients walk pages without needing a total, so they default to
+    ``"none"``; page-number clients default to ``"exact"``.
+
+    Args:
+        args: Request query arguments
+
+    Returns:
+        ``COUNT_EXACT``, None (do not count) or an int cap
+
+    Raises:
+        ValueError: If the value is not one of the accepted forms
+    """
+    value = args.get("count")
+    if not value:
+        value = COUNT_NONE if args.get("cursor") is not None else COUNT_EXACT
+    if value == COUNT_NONE:
+        return None
+    if value == COUNT_EXACT:
+        return COUNT_EXACT
+    try:
+        cap = int(value)
+    except ValueError:
+        cap = 0
+    if cap < 1:
+        raise ValueError("count must be 'exact', 'none' or a positive integer")
+    return cap
+
+
+def parse_page(args, size_key="limit", max_size=DEFAULT_MAX_PAGE_SIZE):
+    """
+    Read the page number and page size query parameters of list endpoints.
+
+    Args:
+        args: Request query arguments
+        size_key (str): Name of the page size parameter (``limit`` or ``per_page``)
+        max_size (int): Largest page size a client may ask for
+
+    Returns:
+        tuple: (page, size)
+
+    Raises:
+        ValueError: If the page is not a positive integer or the size is not
+            between 1 and ``max_size``
+    """
+    try:
+        page = int(args.get("page", 1))
+        size = int(args.get(size_key, DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError(f"page and {size_key} must be integers")
+    if page < 1:
+        raise ValueError("page must be a positive integer")
+    if not 1 <= size <= max_size:
+        raise ValueError(f"{size_key} must be between 1 and {max_size}")
+    return page, size
+
+
+def parse_fields(args, allowed):
+    """
+    Read the ``fields`` query parameter of list endpoints.
+
+    ``fields`` is a comma-separated list of document fields to return; each
+    must be in the route's ``allowed`` list, so secrets such as password
+    hashes can never be requested.
+
+    Args:
+        args: Request query arguments
+        allowed (list): Fields the route may return
+
+    Returns:
+        list: Requested fields, or None when the parameter is absent
+
+    Raises:
+        ValueError: If a requested field is not allowed
+    """
+    value = args.get("fields")
+    if not value:
+        return None
+    fields = list(dict.fromkeys(f.strip() for f in value.split(",") if f.strip()))
+    unknown = [field for field in fields if field not in allowed]
+    if unknown or not fields:
+        raise ValueError(f"Invalid fields: {', '.join(unknown) or value}")
+    return fields
+
+
+def paginate(
+    collection,
+    query,
+    sort,
+    limit,
+    page=1,
+    cursor=None,
+    count=None,
+    stages=None,
+    projection=None,
+):
+    """
+    Fetch one page of ``collection`` in a stable ``sort`` order.
+
+    When ``cursor`` is given (an empty string means "first page") the page is
+    selected with a keyset filter so the cost is the same at any depth.
+    Otherwise the legacy ``page`` number is translated into a skip.
+
+    When ``count`` is requested the total of documents matching ``query`` is
+    a separate ``count_documents``; a cap is passed to the server as the
+    count limit, so capped totals stop scanning at the cap.
+
+    ``stages`` are aggregation stages (e.g. a ``$lookup``) run on the selected
+    page only, so joins cost one lookup per returned document.
+
+    ``projection`` lists the fields to return. Sort keys are always included
+    because the next cursor is built from them; with stages the projection is
+    applied last, so fields the stages read are still available to them.
+
+    Args:
+        collection: PyMongo collection
+        query (dict): Base filter
+        sort (list): Sort specification ending with a unique field (``_id``)
+        limit (int): Page size
+        page (int): 1-based page number, used when no cursor is given
+        cursor (str, optional): Cursor returned by a previous call
+        count: None to skip the total, ``COUNT_EXACT``, or an int cap
+        stages (list, optional): Stages applied to the page after it is selected
+        projection (list, optional): Fields to return; all fields when None
+
+    Returns:
+        Page: items, next_cursor (None on the last page), total and total_capped
+
+    Raises:
+        InvalidCursor: If ``cursor`` cannot be decoded
+        ValueError: If ``limit`` is not positive
+    """
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+
+    # Computed orders such as text relevance have no stored value to resume
+    # from, so they can only be paged by number.
+    keyset_supported = all(isinstance(direction, int) for _, direction in sort)
+    if cursor is not None and not keyset_supported:
+        raise InvalidCursor("Cursor pagination is not available for this sort")
+
+    if projection is not None:
+        projection = dict.fromkeys(projection, 1)
+        projection.update(
+            (field, 1) for field, direction in sort if isinstance(direction, int)
+        )
+
+    skip = 0
+    keyset = None
+    if cursor:
+        keyset = keyset_filter(sort, decode_cursor(cursor, sort))
+    elif cursor is None:
+        skip = max(page - 1, 0) * limit
+
+    base_query = query
+    if keyset:
+        query = {"$and": [query, keyset]}
+    if stages:
+        pipeline = [{"$match": query}, {"$sort": dict(sort)}]
+        if skip:
+            pipeline.append({"$skip": skip})
+        pipeline += [{"$limit": limit + 1}, *stages]
+        if projection is not None:
+            pipeline.append({"$project": projection})
+        documents = list(collection.aggregate(pipeline))
+    else:
+        documents = list(
+            collection.find(query, projection).sort(sort).skip(skip).limit(limit + 1)
+        )
+
+    total = None
+    total_capped = False
+    if count == COUNT_EXACT:
+        total = collection.count_documents(base_query)
+    elif count is not None:
+        total = collection.count_documents(base_query, limit=count + 1)
+        if total > count:
+            total, total_capped = count, True
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        if keyset_supported:
+            next_cursor = encode_cursor(documents[-1], sort)
+    return Page(documents, next_cursor, total, total_capped)
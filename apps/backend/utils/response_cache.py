@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from flask import request
+import threading
+import time
+
+DEFAULT_RESPONSE_CACHE_SIZE = 512
+DEFAULT_RESPONSE_CACHE_TTL = 60
+
+
+class ResponseCache:
+    """
+    Interface for stores of rendered list responses.
+
+    Entries are tagged with the change-version scopes they were built from.
+    Keys already contain those versions, so an entry can never be served
+    after a write in one of its scopes; ``invalidate`` only frees entries
+    early. A shared store (Redis, memcached) can implement this interface
+    and be installed with :func:`set_response_cache`.
+    """
+
+    def get(self, key):
+        """Return the cached ``(body, mimetype)``, or None."""
+        raise NotImplementedError
+
+    def set(self, key, value, scopes, ttl):
+        """Store ``value`` under ``key`` for ``ttl`` seconds, tagged with ``scopes``."""
+        raise NotImplementedError
+
+    def invalidate(self, scopes):
+        """Drop every entry tagged with any of ``scopes``."""
+        raise NotImplementedError
+
+
+class LRUResponseCache(ResponseCache):
+    """In-process LRU cache with a per-entry TTL and a scope index."""
+
+    def __init__(self, maxsize=DEFAULT_RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._keys_by_scope = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= time.time():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, scopes, ttl):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, tuple(scopes), time.time() + ttl)
+            for scope in scopes:
+                self._keys_by_scope.setdefault(scope, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, scopes):
+        with self._lock:
+            for scope in scopes:
+                for key in list(self._keys_by_scope.get(scope, ())):
+                    self._remove(key)
+
+    def _remove(self, key):
+        _, scopes, _ = self._entries.pop(key)
+        for scope in scopes:
+            keys = self._keys_by_scope.get(scope)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_scope[scope]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_scope.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_cache = LRUResponseCache()
+
+
+def get_response_cache():
+    return _cache
+
+
+def set_response_cache(cache):
+    """Install another :class:`ResponseCache`, e.g. one backed by a shared store."""
+    global _cache
+    _cache = cache
+
+
+def response_cache_key(versions):
+    """
+    Key a list response on the endpoint, its normalized arguments and the
+    versions of the scopes it reads.
+
+    Per-user lists are told apart by their scopes (which name the user), so
+    lists that are the same for every viewer share one entry.
+    """
+    args = sorted(request.args.items(multi=True))
+    view_args = sorted((request.view_args or {}).items())
+    scopes = sorted(versions.items())
+    return repr((request.endpoint, view_args, args, scopes))
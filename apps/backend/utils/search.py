@@ -0,0 +1,57 @@
+import re
+import unicodedata
+
+SEARCH_CONTAINS = "contains"
+SEARCH_TEXT = "text"
+SEARCH_PREFIX = "prefix"
+SEARCH_MODES = (SEARCH_CONTAINS, SEARCH_TEXT)
+
+# Relevance first, ``_id`` as tie-breaker so pages stay deterministic.
+TEXT_SCORE_SORT = [("score", {"$meta": "textScore"}), ("_id", -1)]
+
+
+def search_filter(search, fields, mode=SEARCH_CONTAINS):
+    """
+    Build the filter clause for a free-text ``search``.
+
+    ``contains`` keeps the original case-insensitive substring match over
+    ``fields``; it has to scan every candidate document. ``text`` goes through
+    the collection's text index instead and supports relevance ranking.
+
+    Args:
+        search (str): Raw user input
+        fields (list): Fields matched in ``contains`` mode
+        mode (str): One of ``SEARCH_MODES``
+
+    Returns:
+        dict: Filter to merge into the base query
+
+    Raises:
+        ValueError: If ``mode`` is unknown
+    """
+    if mode == SEARCH_TEXT:
+        return {"$text": {"$search": search}}
+    if mode == SEARCH_CONTAINS:
+        regex = re.compile(re.escape(search), re.IGNORECASE)
+        return {"$or": [{field: regex} for field in fields]}
+    raise ValueError(f"Invalid search_mode: {mode}")
+
+
+def normalize_search_key(value):
+    """Lower-case ``value`` and strip accents so "Émile" is stored as "emile"."""
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(folded.casefold().split())
+
+
+def prefix_filter(field, search, normalize=True):
+    """
+    Build an anchored, case-sensitive prefix match on a normalized ``field``.
+
+    Because the pattern is escaped and starts with ``^`` MongoDB turns it into
+    a bounded index range scan instead of evaluating a regex per document.
+    Pass ``normalize=False`` for fields stored as entered, such as ``email``.
+    """
+    if normalize:
+        search = normalize_search_key(search)
+    return {field: {"$regex": "^" + re.escape(search)}}
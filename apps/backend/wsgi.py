@@ -0,0 +1,13 @@
+"""
+Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py
+
+The application is built here, once per process (once in the master with
+``preload_app``); ``app.py`` only defines the factory and, run directly,
+starts the Flask development server.
+"""
+
+from app import create_app
+
+app = application = create_app()
@@ -0,0 +1,75 @@
+import React, { useEffect, useState } from 'react';
+import { Autocomplete, TextField, SxProps, Theme } from '@mui/material';
+import { searchUserEmails } from '../../services/userService';
+
+interface AssigneePickerProps {
+  value: string;
+  onChange: (email: string) => void;
+  size?: 'small' | 'medium';
+  sx?: SxProps<Theme>;
+}
+
+// Wait this long after the last keystroke before asking for suggestions.
+const SEARCH_DELAY_MS = 300;
+
+// Suggests assignees from the typeahead endpoint as the user types instead of
+// loading every user email up front.
+const AssigneePicker: React.FC<AssigneePickerProps> = ({ value, onChange, size, sx }) => {
+  const [input, setInput] = useState('');
+  const [emails, setEmails] = useState<string[]>([]);
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+
+  useEffect(() => {
+    let active = true;
+    const handler = setTimeout(async () => {
+      setLoading(true);
+      try {
+        const users = await searchUserEmails(input.trim());
+        if (active) {
+          setEmails(users.map((user) => user.email));
+          setError(null);
+        }
+      } catch (err) {
+        if (active) setError('Failed to load user emails');
+        console.error('Error searching user emails:', err);
+      } finally {
+        if (active) setLoading(false);
+      }
+    }, SEARCH_DELAY_MS);
+
+    return () => {
+      active = false;
+      clearTimeout(handler);
+    };
+  }, [input]);
+
+  // Keep the current assignee selectable even when it is not a suggestion.
+  const options = value && !emails.includes(value) ? [value, ...emails] : emails;
+
+  return (
+    <Autocomplete
+      options={options}
+      value={value || null}
+      onChange={(_, email) => onChange(email || '')}
+      inputValue={input}
+      onInputChange={(_, text) => setInput(text)}
+      // The server already filtered by prefix.
+      filterOptions={(options) => options}
+      loading={loading}
+      size={size}
+      fullWidth
+      sx={sx}
+      renderInput={(params) => (
+        <TextField
+          {...params}
+          placeholder="Select Assignee"
+          error={!!error}
+          helperText={error}
+        />
+      )}
+    />
+  );
+};
+
+export default AssigneePicker;
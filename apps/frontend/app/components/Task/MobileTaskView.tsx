@@ -19,6 +19,7 @@ import CheckIcon from '@mui/icons-material/Check';
 import CloseIcon from '@mui/icons-material/Close';
 import { Task } from '../../types/Task';
 import { statusBadgeStyle, actionButtonStyle } from './styles';
+import AssigneePicker from './AssigneePicker';
 
 interface MobileTaskViewProps {
   tasks: Task[];
@@ -27,9 +28,6 @@ interface MobileTaskViewProps {
   editingTaskId: string | null;
   selectedTask: Task | null;
   theme: Theme;
-  userEmails: string[];
-  loadingEmails?: boolean;
-  emailError?: string | null;
   handleEdit: (task: Task) => void;
   handleSave: () => void;
   handleCancelEdit: () => void;
@@ -46,9 +44,6 @@ const MobileTaskView: React.FC<MobileTaskViewProps> = ({
   editingTaskId,
   selectedTask,
   theme,
-  userEmails,
-  loadingEmails,
-  emailError,
   handleEdit,
   handleSave,
   handleCancelEdit,
@@ -119,27 +114,12 @@ const MobileTaskView: React.FC<MobileTaskViewProps> = ({
             <Box sx={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', mb: 1 }}>
               {editingTaskId === task._id ? (
                     <>
-                        {loadingEmails ? (
-                        <Typography variant="body2">Loading emails...</Typography>
-                        ) : emailError ? (
-                        <Typography color="error" variant="body2">
-                            {emailError}
-                        </Typography>
-                        ) : (
-                        <Select
-                            value={selectedTask?.assignee || ''}
-                            onChange={(e) => handleTaskChange('assignee', e.target.value)}
-                            size="small"
-                            fullWidth
-                            sx={{ mb: 2 }}
-                        >
-                            {userEmails.map((email) => (
-                            <MenuItem key={email} value={email}>
-                                {email}
-                            </MenuItem>
-                            ))}
-                        </Select>
-                        )}
+                        <AssigneePicker
+                          value={selectedTask?.assignee || ''}
+                          onChange={(email) => handleTaskChange('assignee', email)}
+                          size="small"
+                          sx={{ mb: 2 }}
+                        />
                     </>
                     ) : (
                     <Typography variant="body2" sx={{ mb: 1 }}>
@@ -18,7 +18,6 @@
   import { useSearchParams } from 'next/navigation';
   import { Task, STATUS_OPTIONS, ITEMS_PER_PAGE } from '../../types/Task';
   import { fetchTasks, createTask, deleteTask, updateTask } from '../../services/taskServices';
-  import { fetchUserEmails } from '../../services/userService';
 const CreateModal = dynamic(() => import('./createModal'));
 const DeleteModal = dynamic(() => import('./DeleteModal'));
 const TaskTableView = dynamic(() => import('./TaskTableView'));
@@ -38,9 +37,6 @@ const MobileTaskView = dynamic(() => import('./MobileTaskView'));
     const [statusFilter, setStatusFilter] = useState('');
     const [page, setPage] = useState(1);
     const [totalCount, setTotalCount] = useState(0);
-    const [userEmails, setUserEmails] = useState<string[]>([]);
-    const [loadingEmails, setLoadingEmails] = useState(false);
-    const [emailError, setEmailError] = useState<string | null>(null);
 
     const searchParams = useSearchParams();
     const projectId = searchParams.get('projectId');
@@ -96,24 +92,6 @@ const MobileTaskView = dynamic(() => import('./MobileTaskView'));
       setPage(1);
     }, [debouncedSearchTerm, statusFilter]);
 
-    useEffect(() => {
-        const loadUserEmails = async () => {
-
-          setLoadingEmails(true);
-          try {
-            const emails = await fetchUserEmails();
-            setUserEmails(emails);
-          } catch (err) {
-            setEmailError('Failed to load user emails');
-            console.error('Error fetching user emails:', err);
-          } finally {
-            setLoadingEmails(false);
-          }
-        };
-
-        loadUserEmails();
-      }, []);
-
     const handleOpenCreateModal = () => {
       setSelectedTask({
         _id: '',
@@ -242,9 +220,6 @@ const MobileTaskView = dynamic(() => import('./MobileTaskView'));
       selectedTask,
       theme,
       projectId,
-      userEmails,
-      loadingEmails,
-      emailError,
       handleEdit,
       handleSave,
       handleCancelEdit,
@@ -413,9 +388,6 @@ const MobileTaskView = dynamic(() => import('./MobileTaskView'));
           onChange={setSelectedTask}
           onSubmit={handleCreate}
           theme={theme}
-          userEmails={userEmails}
-          loadingEmails={loadingEmails}
-          emailError={emailError}
         />
 
         <DeleteModal
@@ -23,6 +23,7 @@ import CheckIcon from '@mui/icons-material/Check';
 import CloseIcon from '@mui/icons-material/Close';
 import { Task } from '../../types/Task';
 import { tableHeaderStyle, statusBadgeStyle, actionButtonStyle } from './styles';
+import AssigneePicker from './AssigneePicker';
 
 interface TaskTableViewProps {
   tasks: Task[];
@@ -32,9 +33,6 @@ interface TaskTableViewProps {
   selectedTask: Task | null;
   theme: Theme;
   projectId: string | null;
-  userEmails: string[];
-  loadingEmails?: boolean;
-  emailError?: string | null;
   handleEdit: (task: Task) => void;
   handleSave: () => void;
   handleCancelEdit: () => void;
@@ -52,9 +50,6 @@ const TaskTableView: React.FC<TaskTableViewProps> = ({
   selectedTask,
   theme,
   projectId,
-  userEmails,
-  loadingEmails,
-  emailError,
   handleEdit,
   handleSave,
   handleCancelEdit,
@@ -135,27 +130,11 @@ const TaskTableView: React.FC<TaskTableViewProps> = ({
                 <TableCell sx={{ maxWidth: { xs: 100, sm: 150 }, overflow: 'hidden', textOverflow: 'ellipsis', whiteSpace: 'nowrap' }}>
                     {editingTaskId === task._id ? (
                         <>
-                        {loadingEmails ? (
-                            <Typography variant="body2">Loading emails...</Typography>
-                        ) : emailError ? (
-                            <Typography color="error" variant="body2">
-                            {emailError}
-                            </Typography>
-                        ) : (
-                            <Select
-                            value={selectedTask?.assignee || ''}
-                            onChange={(e) => handleTaskChange('assignee', e.target.value)}
-                            size="small"
-                            fullWidth
-                            sx={{ borderRadius: 1 }}
-                            >
-                            {userEmails.map((email) => (
-                                <MenuItem key={email} value={email}>
-                                {email}
-                                </MenuItem>
-                            ))}
-                            </Select>
-                        )}
+                        <AssigneePicker
+                          value={selectedTask?.assignee || ''}
+                          onChange={(email) => handleTaskChange('assignee', email)}
+                          size="small"
+                        />
                         </>
                     ) : (
                         <Tooltip title={task.assignee} arrow>
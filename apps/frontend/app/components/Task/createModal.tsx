@@ -9,15 +9,13 @@ import {
   Backdrop,
   IconButton,
   alpha,
-  CircularProgress,
-  MenuItem,
-  Select,
   Theme
 } from '@mui/material';
 import CloseIcon from '@mui/icons-material/Close';
 import { motion } from 'framer-motion';
 import { Task } from '../../types/Task';
 import { modalStyle } from './styles';
+import AssigneePicker from './AssigneePicker';
 
 interface CreateModalProps {
   open: boolean;
@@ -26,9 +24,6 @@ interface CreateModalProps {
   onChange: (updatedTask: Task) => void;
   onSubmit: () => void;
   theme: Theme;
-  userEmails: string[];
-  loadingEmails?: boolean;
-  emailError?: string | null;
 }
 
 const CreateModal: React.FC<CreateModalProps> = ({
@@ -38,9 +33,6 @@ const CreateModal: React.FC<CreateModalProps> = ({
   onChange,
   onSubmit,
   theme,
-  userEmails,
-  loadingEmails,
-  emailError,
 }) => {
   // Safe default values
   const safeTask = task || {
@@ -160,40 +152,11 @@ const CreateModal: React.FC<CreateModalProps> = ({
           />
 
           {/* Assignee Field */}
-          {loadingEmails ? (
-            <Box sx={{ display: 'flex', alignItems: 'center', gap: 1, mb: 3 }}>
-              <CircularProgress size={20} />
-              <Typography variant="body2">Loading assignees...</Typography>
-            </Box>
-          ) : emailError ? (
-            <Typography color="error" sx={{ mb: 3 }}>{emailError}</Typography>
-          ) : (
-            <Select
-              fullWidth
-
-              value={safeTask.assignee}
-              onChange={(e) => handleChange('assignee', e.target.value as string)}
-              sx={{
-                mb: 3,
-                borderRadius: 2,
-                '& .MuiOutlinedInput-root': {
-                  '&:hover': {
-                    boxShadow: `0 0 0 2px ${alpha(theme.palette.primary.main, 0.2)}`,
-                  },
-                },
-              }}
-
-            >
-              <MenuItem value="" disabled>
-                Select Assignee
-              </MenuItem>
-              {userEmails.map((email) => (
-                <MenuItem key={email} value={email}>
-                  {email}
-                </MenuItem>
-              ))}
-            </Select>
-          )}
+          <AssigneePicker
+            value={safeTask.assignee}
+            onChange={(email) => handleChange('assignee', email)}
+            sx={{ mb: 3 }}
+          />
 
           {/* Submit Button */}
           <Box component={motion.div} whileHover={{ scale: 1.02 }} whileTap={{ scale: 0.98 }}>
@@ -16,32 +16,118 @@ interface UseSessionReturn {
   loading: boolean;
 }
 
+// Refresh the access token this long before it expires.
+const REFRESH_MARGIN_MS = 60 * 1000;
+// Held while a refresh token is rotated so only one tab uses it.
+const REFRESH_LOCK = 'workhub-session-refresh';
+
+// Refresh tokens are single use, so every hook instance in this tab shares
+// one rotation.
+let refreshInFlight: Promise<string | null> | null = null;
+
+const freshToken = (): string | null => {
+  const token = localStorage.getItem('token');
+  if (!token) return null;
+  try {
+    const { exp } = jwtDecode<SessionData>(token);
+    return exp * 1000 - Date.now() > REFRESH_MARGIN_MS ? token : null;
+  } catch {
+    return null;
+  }
+};
+
+const rotateRefreshToken = async (): Promise<string | null> => {
+  // Another tab may have rotated the token while this one waited.
+  const current = freshToken();
+  if (current) return current;
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (!refreshToken) return null;
+  try {
+    const res = await fetch('http://localhost:5000/api/auth/refresh', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    });
+    if (!res.ok) return freshToken();
+    const data = await res.json();
+    localStorage.setItem('token', data.token);
+    localStorage.setItem('refresh_token', data.refresh_token);
+    return data.token;
+  } catch {
+    return null;
+  }
+};
+
+const refreshSession = (): Promise<string | null> => {
+  if (!refreshInFlight) {
+    const rotation =
+      typeof navigator !== 'undefined' && navigator.locks
+        ? navigator.locks.request(REFRESH_LOCK, rotateRefreshToken)
+        : rotateRefreshToken();
+    refreshInFlight = rotation.finally(() => {
+      refreshInFlight = null;
+    });
+  }
+  return refreshInFlight;
+};
+
 export const useSession = (): UseSessionReturn => {
   const [session, setSession] = useState<SessionData | null>(null);
   const [loading, setLoading] = useState(true);
   const router = useRouter()
 
   useEffect(() => {
-    const token = localStorage.getItem('token');
-    if (token) {
-      try {
-        const decoded = jwtDecode<SessionData>(token);
-        if (decoded.exp * 1000 > Date.now()) {
-          setSession(decoded);
-        } else {
-          localStorage.removeItem('token');
-          alert('Invalid session. Please  log in again.');
-          router.push('/login');
+    let timer: ReturnType<typeof setTimeout> | undefined;
 
-        }
-      } catch {
-        localStorage.removeItem('token');
-        alert('Invalid session. Please log in again.');
-        router.push('/login');
+    const endSession = () => {
+      localStorage.removeItem('token');
+      localStorage.removeItem('refresh_token');
+      alert('Invalid session. Please log in again.');
+      router.push('/login');
+    };
+
+    const startSession = (token: string) => {
+      const decoded = jwtDecode<SessionData>(token);
+      setSession(decoded);
+      clearTimeout(timer);
+      const delay = Math.max(decoded.exp * 1000 - Date.now() - REFRESH_MARGIN_MS, 0);
+      timer = setTimeout(async () => {
+        const refreshed = await refreshSession();
+        if (refreshed) startSession(refreshed);
+        else endSession();
+      }, delay);
+    };
 
+    const load = async () => {
+      const token = localStorage.getItem('token');
+      if (token) {
+        try {
+          const decoded = jwtDecode<SessionData>(token);
+          if (decoded.exp * 1000 > Date.now()) {
+            startSession(token);
+          } else {
+            const refreshed = await refreshSession();
+            if (refreshed) startSession(refreshed);
+            else endSession();
+          }
+        } catch {
+          endSession();
+        }
       }
-    }
-    setLoading(false);
+      setLoading(false);
+    };
+
+    // Pick up tokens that another tab rotated.
+    const onStorage = (event: StorageEvent) => {
+      if (event.key === 'token' && event.newValue) startSession(event.newValue);
+    };
+
+    window.addEventListener('storage', onStorage);
+    load();
+    return () => {
+      window.removeEventListener('storage', onStorage);
+      clearTimeout(timer);
+    };
   },[router]);
 
   return { session, loading };
@@ -101,6 +101,7 @@ const LoginPage = () => {
       const data = await res.json();
 
       localStorage.setItem('token', data.token);
+      localStorage.setItem('refresh_token', data.refresh_token);
 
       if (!res.ok) {
         if (data.message?.includes('Invalid credentials')) {
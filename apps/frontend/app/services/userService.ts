@@ -66,15 +66,24 @@ export const deleteUser = async (id: string): Promise<void> => {
   if (!res.ok) throw new Error('Failed to delete user');
 };
 
-export const fetchUserEmails = async (): Promise<string[]> => {
+export interface UserSuggestion {
+  email: string;
+  full_name: string;
+}
+
+export const searchUserEmails = async (
+  query: string,
+  limit = 10
+): Promise<UserSuggestion[]> => {
   const token = localStorage.getItem('token');
+  const params = new URLSearchParams({ q: query, limit: String(limit) });
 
-  const res = await fetch(`${API_BASE_URL}/users/emails`, {
+  const res = await fetch(`${API_BASE_URL}/users/typeahead?${params}`, {
     headers: { Authorization: token || '' },
   });
 
-  if (!res.ok) throw new Error('Failed to fetch user emails');
+  if (!res.ok) throw new Error('Failed to search users');
 
   const data = await res.json();
-  return data.emails;
+  return data.users;
 };
\ No newline at end of file
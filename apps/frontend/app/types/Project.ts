@@ -3,6 +3,7 @@ export interface Project {
   name: string;
   description: string;
   owner_email: string;
+  owner_id?: string | null;
 }
 
 export interface ServerResponse {
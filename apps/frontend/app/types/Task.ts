@@ -3,7 +3,10 @@ export interface Task {
   title: string;
   description: string;
   project_id: string;
+  project_name?: string;
+  project_owner?: string;
   assignee: string;
+  assignee_id?: string | null;
   status: string;
 }
 
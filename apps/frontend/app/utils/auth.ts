@@ -1,5 +1,15 @@
 
 export const logout = () => {
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (refreshToken) {
+    fetch('http://localhost:5000/api/auth/logout', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+      keepalive: true,
+    });
+  }
   localStorage.removeItem('token');
+  localStorage.removeItem('refresh_token');
   window.location.href = '/login';
 };